@@ -1,4 +1,18 @@
 from .discord_card import RankCard
 from .card_settings import Settings
 from .sandbox import Sandbox
-from .tester import Tester
\ No newline at end of file
+from .tester import Tester
+from .executor import get_executor, set_executor, shutdown_executor
+from .process_pool import ProcessRenderer, RenderJob
+from .http_session import create_session, get_session, set_session, close_session
+from .avatar_cache import AvatarCache, avatar_cache
+from .overlay_cache import OverlayCache, overlay_cache
+from .output import Output, get_default_output, set_default_output
+from .canvas_layout import CanvasLayout
+from .member_cache import MemberCache, member_cache
+from .text_cache import TextCache, text_cache
+from .timings import RenderTimings
+from .image_loader import ImageLimits, image_limits
+from .discord_cdn import get_cdn_sizing, set_cdn_sizing
+from .render_cache import RenderCache, render_cache
+from .scheduler import RenderScheduler
@@ -0,0 +1,91 @@
+import copy
+import math
+from io import BytesIO
+from typing import Any, Dict, List, Tuple, Union
+
+from PIL import Image
+
+from .avatar_cache import MaskedAvatar, prepare_avatar
+from .timings import stage
+
+# browsers show shorter GIF frames for 100ms, so no frame is made shorter than this
+MIN_DURATION = 20
+
+
+class _Capture:
+    """An output that returns the finished card instead of encoding it"""
+
+    __slots__ = ()
+    as_bytes = True
+
+    def encode(self, image: Image.Image) -> Image.Image:
+        return image
+
+
+def is_animated(image: Image.Image) -> bool:
+    """returns whether `image` has more than one frame"""
+    return getattr(image, "is_animated", False) and getattr(image, "n_frames", 1) > 1
+
+
+def avatar_frames(image: Image.Image, size: int, frame: str, max_frames: int = 0, max_duration: int = 0) -> List[Tuple[MaskedAvatar, int]]:
+    """returns the frames of the animated `image` prepared like :func:`prepare_avatar`, with their durations in milliseconds
+
+    A frame equal to the previous one is merged into it, the animation is cut after `max_duration`
+    and above `max_frames` neighbouring frames are merged evenly. `0` disables a limit.
+    """
+    frames: List[List[Any]] = []
+    previous = None
+    total = 0
+    try:
+        for index in range(image.n_frames):
+            image.seek(index)
+            duration = max(int(image.info.get("duration") or 100), MIN_DURATION)
+            avatar = prepare_avatar(image.convert("RGBA"), size, frame)
+            pixels = avatar.image.tobytes()
+            if pixels == previous:
+                frames[-1][1] += duration
+            else:
+                frames.append([avatar, duration])
+                previous = pixels
+            total += duration
+            if max_duration and total >= max_duration:
+                break
+    finally:
+        image.seek(0)
+
+    if max_frames and len(frames) > max_frames:
+        step = math.ceil(len(frames) / max_frames)
+        frames = [[frames[i][0], sum(duration for _, duration in frames[i:i+step])] for i in range(0, len(frames), step)]
+    return [(avatar, duration) for avatar, duration in frames]
+
+
+def render_animated(card: Any, design: str, image: Image.Image, options: Dict[str, Any]) -> Union[BytesIO, bytes]:
+    """renders `design` of `card` with the animated avatar `image` as an animation in `options["output"]`
+
+    The card without its avatar is drawn once, every frame only pastes the
+    avatar resized to its final size onto a copy of it.
+    """
+    output = options["output"]
+    size, frame = card._avatar_frame(design, options)
+    position, canvas = card._avatar_box(design, options)
+
+    # drawn without the avatar and without the member cache, the copy has no url avatar
+    still = copy.copy(card)
+    still.avatar = image
+    blank = MaskedAvatar(Image.new("RGB", (size, size)), Image.new("L", (size, size), 0))
+    static = getattr(still, "_" + design)(blank, **dict(options, output=_Capture()))
+
+    # the card can be resized after the avatar was pasted, place it at the final scale
+    factor = static.width / canvas[0]
+    final_size = max(1, round(size * factor))
+    final_position = (round(position[0] * factor), round(position[1] * static.height / canvas[1]))
+
+    frames = avatar_frames(image, final_size, frame, output.max_frames, output.max_duration)
+    images = []
+    with stage("frames"):
+        for avatar, _ in frames:
+            composed = static.copy()
+            composed.paste(avatar.image, final_position, avatar.mask)
+            images.append(composed)
+    with stage("encode"):
+        return output.encode_frames(images, [duration for _, duration in frames])
@@ -0,0 +1,87 @@
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Tuple
+
+from PIL import Image
+
+ASSETS_PATH = Path(__file__).parent / "assets"
+
+
+class AssetRegistry:
+    """Process-wide store of the decoded bundled assets
+
+    Every asset is decoded from disk only once, its converted variants are
+    kept next to it and the resized masks are memoized by their target size.
+    The returned images are shared between all renders, so they must be
+    treated as read-only (paste them, never paste onto them).
+
+    Parameters
+    ----------
+    path: :class:`Path`
+        The directory the assets are read from. Default is the bundled `assets` folder
+
+    Attributes
+    ----------
+    - `path`
+
+    Methods
+    -------
+    - `image`
+        The decoded asset as it is stored on disk
+    - `luminance`
+        The asset converted to `L` mode
+    - `alpha`
+        The alpha band of the asset
+    - `mask`
+        The asset converted to `L` mode and resized to the given size
+    """
+
+    __slots__ = ('path', '_lock', '_images', '_variants')
+
+    def __init__(self, path: Path = ASSETS_PATH) -> None:
+        self.path = Path(path)
+        self._lock = Lock()
+        self._images: Dict[str, Image.Image] = {}
+        self._variants: Dict[Tuple, Image.Image] = {}
+
+    def image(self, name: str) -> Image.Image:
+        """returns the decoded asset `name`"""
+        image = self._images.get(name)
+        if image is None:
+            with self._lock:
+                image = self._images.get(name)
+                if image is None:
+                    image = Image.open(self.path / name)
+                    image.load()
+                    self._images[name] = image
+        return image
+
+    def _variant(self, key: Tuple, factory) -> Image.Image:
+        image = self._variants.get(key)
+        if image is None:
+            created = factory()
+            with self._lock:
+                image = self._variants.setdefault(key, created)
+        return image
+
+    def luminance(self, name: str) -> Image.Image:
+        """returns the asset `name` converted to `L` mode"""
+        return self._variant(("L", name), lambda: self.image(name).convert("L"))
+
+    def alpha(self, name: str) -> Image.Image:
+        """returns the alpha band of the asset `name`"""
+        return self._variant(("A", name), lambda: self.image(name).convert("RGBA").getchannel("A"))
+
+    def mask(self, name: str, size: Tuple[int, int]) -> Image.Image:
+        """returns the asset `name` converted to `L` mode and resized to `size`"""
+        size = (int(size[0]), int(size[1]))
+        return self._variant(("mask", name, size), lambda: self.luminance(name).resize(size))
+
+    def clear(self) -> None:
+        """drops every decoded asset and variant"""
+        with self._lock:
+            self._images.clear()
+            self._variants.clear()
+
+
+registry = AssetRegistry()
@@ -0,0 +1,202 @@
+import os
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Dict, Hashable, NamedTuple, Optional, Tuple, Union
+
+from PIL import Image
+
+from .asset_registry import registry
+from .image_loader import reduce_image
+from .timings import stage
+
+# bundled masks of the named avatar frames
+FRAMES = {
+    "circle": "mask_circle.jpg",
+    "curvedborder": "curveborder.png",
+    "hexagon": "mask_hexagon.png",
+}
+
+
+class MaskedAvatar(NamedTuple):
+    """An avatar resized for a design, ready to be pasted as `background.paste(image, position, mask)`"""
+
+    image: Image.Image
+    mask: Image.Image
+
+
+# self created masks kept by (absolute path, modification time, size), they are not pinned like the bundled ones
+MAX_CUSTOM_MASKS = 32
+_custom_masks: "OrderedDict[Tuple[str, int, int], Image.Image]" = OrderedDict()
+_custom_lock = Lock()
+
+
+def _custom_mask(path: str, size: int) -> Image.Image:
+    # a path relative to the working directory, like `Image.open` always resolved it
+    key = (os.path.abspath(path), os.stat(path).st_mtime_ns, size)
+    with _custom_lock:
+        mask = _custom_masks.get(key)
+        if mask is not None:
+            _custom_masks.move_to_end(key)
+            return mask
+    with Image.open(path) as image:
+        mask = image.resize((size, size)).convert("L")
+    with _custom_lock:
+        _custom_masks[key] = mask
+        while len(_custom_masks) > MAX_CUSTOM_MASKS:
+            _custom_masks.popitem(last=False)
+    return mask
+
+
+def frame_mask(frame: str, size: int) -> Image.Image:
+    """returns the `L` mode mask of `frame` at `size`
+
+    `frame` can be `circle` `square` `curvedborder` `hexagon` or a path to a self created mask
+    (relative to the working directory), anything that can not be opened falls back to `curvedborder`.
+    """
+    if frame == "square":
+        return Image.new("L", (size, size), 255)
+    if frame in FRAMES:
+        return registry.mask(FRAMES[frame], (size, size))
+    try:
+        return _custom_mask(frame, size)
+    except (OSError, ValueError):
+        return registry.mask(FRAMES["curvedborder"], (size, size))
+
+
+def prepare_avatar(avatar: Image.Image, size: int, frame: str) -> MaskedAvatar:
+    """resizes `avatar` to `size`, flattens its transparency on black and pairs it with the mask of `frame`"""
+    with stage("avatar_decode"):
+        avatar.load()
+    with stage("avatar_resize"):
+        avatar = reduce_image(avatar, (size, size)).resize((size, size))
+        image = Image.new("RGB", avatar.size, (0, 0, 0))
+        try:
+            image.paste(avatar, mask=avatar.convert("RGBA").split()[3])
+        except Exception:
+            image.paste(avatar, (0, 0))
+        return MaskedAvatar(image, frame_mask(frame, size))
+
+
+class AvatarCache:
+    """Least recently used cache of prepared avatars
+
+    Entries are keyed by `(avatar url, size, frame)`, the url already embeds
+    the avatar hash on the Discord CDN so a changed avatar is a new entry.
+    An animated avatar is kept as it was downloaded, by `(avatar url, size)`,
+    its frames are prepared for the size of every card.
+
+    Parameters
+    ----------
+    max_bytes: :class:`int`
+        The memory budget of the cached avatars in bytes, `0` disables the cache. Default is `32 MiB`
+
+    ttl: :class:`float`
+        Seconds an avatar stays in the cache. Default is `3600`
+
+    Attributes
+    ----------
+    - `max_bytes`
+    - `ttl`
+    - `hits`
+    - `misses`
+    - `evictions`
+    - `size`
+        The number of bytes currently used
+
+    Methods
+    -------
+    - `get`
+        returns the cached avatar or `None`
+    - `put`
+        stores an avatar
+    - `get_animated`
+        returns the cached animated avatar or `None`
+    - `put_animated`
+        stores an animated avatar
+    - `stats`
+        returns the counters as a `dict`
+    - `clear`
+        drops every cached avatar
+    """
+
+    __slots__ = ('max_bytes', 'ttl', 'hits', 'misses', 'evictions', 'size', '_lock', '_entries')
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, ttl: float = 3600) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+        self._lock = Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[Union[MaskedAvatar, bytes], int, float]]" = OrderedDict()
+
+    @staticmethod
+    def _key(url: str, size: int, frame: str) -> Tuple[str, int, str]:
+        return (url, int(size), frame)
+
+    def get(self, url: str, size: int, frame: str) -> Optional[MaskedAvatar]:
+        """returns the avatar cached for `url` at `size` with `frame` or `None`"""
+        return self._get(self._key(url, size, frame))
+
+    def get_animated(self, url: str, size: int) -> Optional[bytes]:
+        """returns the encoded animated avatar downloaded for `url` at `size` or `None`"""
+        return self._get((url, int(size)))
+
+    def _get(self, key: Hashable) -> Optional[Union[MaskedAvatar, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] < monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, url: str, size: int, frame: str, avatar: MaskedAvatar) -> None:
+        """caches `avatar` for `url` at `size` with `frame`"""
+        self._put(self._key(url, size, frame), avatar, len(avatar.image.getbands()) * avatar.image.width * avatar.image.height)
+
+    def put_animated(self, url: str, size: int, data: bytes) -> None:
+        """caches the encoded animated avatar `data` downloaded for `url` at `size`"""
+        self._put((url, int(size)), data, len(data))
+
+    def _put(self, key: Hashable, avatar: Union[MaskedAvatar, bytes], nbytes: int) -> None:
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (avatar, nbytes, monotonic() + self.ttl)
+            self.size += nbytes
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        _, nbytes, _ = self._entries.pop(key)
+        self.size -= nbytes
+
+    def stats(self) -> Dict[str, int]:
+        """returns the cache counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def clear(self) -> None:
+        """drops every cached avatar, the counters are kept"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+avatar_cache = AvatarCache()
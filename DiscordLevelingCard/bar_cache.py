@@ -0,0 +1,170 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Hashable, Optional, Tuple, Union
+
+from PIL import Image, ImageColor, ImageDraw
+
+from .timings import stage
+
+Colour = Union[str, Tuple[int, ...]]
+
+
+class BarSprite:
+    """The pre-rendered XP bar of one geometry
+
+    Holds the bar image with its track drawn and the rounded start and end
+    caps cut from a fill that spans the whole track. A fill of any other
+    length is the start cap, a plain rectangle and the end cap moved to the
+    end of the fill, which is exactly what `rounded_rectangle` would draw,
+    so no rounded shape is rasterized per render. A translucent fill on a bar
+    without alpha is blended by `rounded_rectangle` itself, pasting the caps
+    would not blend it.
+
+    Methods
+    -------
+    - `render`
+        returns a new bar image filled to the given length
+    """
+
+    __slots__ = ('track', 'width', 'height', 'curve', '_size', '_start', '_end', '_rows', '_lock', '_short')
+
+    def __init__(self, mode: str, size: Tuple[int, int], background: Optional[Colour], width: int, height: int, curve: int, track_fill: Colour) -> None:
+        self.width = width
+        self.height = height
+        self.curve = curve
+        self.track = Image.new(mode, size, background) if background is not None else Image.new(mode, size)
+        ImageDraw.Draw(self.track, "RGBA").rounded_rectangle((0, 0, width, height), curve, fill=track_fill)
+        self._size = size
+        full = Image.new("L", size)
+        ImageDraw.Draw(full).rounded_rectangle((0, 0, width, height), curve, fill=255)
+        self._start = full.crop((0, 0, self.cap, size[1]))
+        self._end = full.crop((width - self.cap, 0, width + 1, size[1]))
+        # the rows of the straight part between the caps, `None` when it is not a solid rectangle
+        column = full.crop((self.cap, 0, self.cap + 1, size[1]))
+        box = column.getbbox()
+        solid = box is not None and column.crop(box).getextrema() == (255, 255)
+        self._rows = (box[1], box[3] - 1) if solid and width >= self.cap * 2 else None
+        self._lock = Lock()
+        self._short: Dict[Tuple[int, int], Image.Image] = {}
+
+    @property
+    def cap(self) -> int:
+        """The width of the rounded end of the fill"""
+        return self.curve * 2 + 1
+
+    def _short_mask(self, length: float, curve: int) -> Optional[Image.Image]:
+        whole = int(length)
+        if length != whole or whole >= self.cap * 2:
+            # a fill longer than the track, or a short fill with a fractional length whose corners depend on the fraction
+            return None
+
+        key = (whole, curve)
+        mask = self._short.get(key)
+        if mask is None:
+            mask = Image.new("L", self._size)
+            ImageDraw.Draw(mask).rounded_rectangle((0, 0, length, self.height), curve, fill=255)
+            with self._lock:
+                mask = self._short.setdefault(key, mask)
+        return mask
+
+    def render(self, length: float, fill: Colour, curve: Optional[int] = None) -> Image.Image:
+        """returns a copy of the track with a fill of `length` pixels in `fill`
+
+        `curve` is the curve of the fill, default is the curve of the track
+        """
+        with stage("bar"):
+            return self._render(length, fill, self.curve if curve is None else curve)
+
+    def _blends(self, fill: Colour) -> bool:
+        # `rounded_rectangle` blends a translucent fill onto a bar without alpha, `bitmap` would paste it opaque
+        if self.track.mode == "RGBA":
+            return False
+        if isinstance(fill, str):
+            return ImageColor.getcolor(fill, "RGBA")[3] < 255
+        return len(fill) == 4 and fill[3] < 255
+
+    def _render(self, length: float, fill: Colour, curve: int) -> Image.Image:
+        image = self.track.copy()
+        draw = ImageDraw.Draw(image, "RGBA")
+        if self._blends(fill):
+            draw.rounded_rectangle((0, 0, length, self.height), curve, fill=fill)
+            return image
+        whole = int(length)
+        if curve == self.curve and self._rows is not None and self.cap * 2 <= whole and length <= self.width:
+            draw.bitmap((0, 0), self._start, fill=fill)
+            if whole > self.cap * 2:
+                draw.rectangle((self.cap, self._rows[0], whole - self.cap - 1, self._rows[1]), fill=fill)
+            draw.bitmap((whole - self.cap, 0), self._end, fill=fill)
+            return image
+
+        mask = self._short_mask(length, curve)
+        if mask is None:
+            draw.rounded_rectangle((0, 0, length, self.height), curve, fill=fill)
+        else:
+            draw.bitmap((0, 0), mask, fill=fill)
+        return image
+
+
+class BarCache:
+    """Least recently used cache of :class:`BarSprite` keyed by the bar geometry and colours
+
+    Parameters
+    ----------
+    maxsize: :class:`int`
+        The maximum number of bars to keep. Default is `64`
+
+    Attributes
+    ----------
+    - `maxsize`
+
+    Methods
+    -------
+    - `get`
+        returns the sprite of a bar
+    - `clear`
+        drops every cached bar
+    """
+
+    __slots__ = ('maxsize', '_lock', '_bars')
+
+    def __init__(self, maxsize: int = 64) -> None:
+        self.maxsize = maxsize
+        self._lock = Lock()
+        self._bars: "OrderedDict[Hashable, BarSprite]" = OrderedDict()
+
+    def get(
+        self,
+        mode: str,
+        size: Tuple[int, int],
+        background: Optional[Colour],
+        width: int,
+        height: int,
+        curve: int,
+        track_fill: Colour
+    ) -> BarSprite:
+        """returns the bar of `size` in `mode` filled with `background`, with a track of
+        `width` x `height` rounded by `curve` in `track_fill`
+        """
+        key = (mode, size, background, width, height, curve, track_fill)
+        with self._lock:
+            bar = self._bars.get(key)
+            if bar is not None:
+                self._bars.move_to_end(key)
+                return bar
+
+        with stage("bar"):
+            bar = BarSprite(mode, size, background, width, height, curve, track_fill)
+        with self._lock:
+            bar = self._bars.setdefault(key, bar)
+            self._bars.move_to_end(key)
+            while len(self._bars) > self.maxsize:
+                self._bars.popitem(last=False)
+        return bar
+
+    def clear(self) -> None:
+        """drops every cached bar"""
+        with self._lock:
+            self._bars.clear()
+
+
+bar_cache = BarCache()
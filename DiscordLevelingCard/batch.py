@@ -0,0 +1,52 @@
+import asyncio
+import inspect
+from concurrent.futures import Executor
+from io import BytesIO
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Tuple, Union
+
+from .card_settings import Settings
+from .process_pool import ProcessRenderer
+
+
+def _card_options(card_class: type, design: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    if design not in card_class._designs:
+        raise ValueError(f"design must be one of {', '.join(card_class._designs)}, not {design!r}")
+    bound = inspect.signature(getattr(card_class, design)).bind(None, **options)
+    bound.apply_defaults()
+    arguments = dict(bound.arguments)
+    arguments.pop("self")
+    return card_class._options(design, arguments)
+
+
+async def render_many(
+    card_class: type,
+    settings: Settings,
+    members: Iterable[Dict[str, Any]],
+    design: str,
+    concurrency: int = 8,
+    executor: Optional[Union[Executor, ProcessRenderer]] = None,
+    return_exceptions: bool = False,
+    **options: Any
+) -> AsyncIterator[Tuple[Dict[str, Any], Union[BytesIO, BaseException]]]:
+    """renders `design` of `card_class` for every member, see :meth:`RankCard.render_many`"""
+    options = _card_options(card_class, design, options)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def render(member):
+        # the card's own render, with the render cache, the coalesced renders, its scheduler and timings hook
+        try:
+            card = card_class(settings=settings, executor=executor, **member)
+            async with semaphore:
+                return member, await card._render(design, **options)
+        except Exception as error:
+            if not return_exceptions:
+                raise
+            return member, error
+
+    tasks = [asyncio.ensure_future(render(member)) for member in members]
+    try:
+        for result in asyncio.as_completed(tasks):
+            yield await result
+    finally:
+        for task in tasks:
+            task.cancel()
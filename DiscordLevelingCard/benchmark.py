@@ -0,0 +1,273 @@
+"""Benchmark of every design, run it with `python -m DiscordLevelingCard.benchmark`
+
+Only synthetic local images are used, nothing is downloaded. The results are
+printed as a table and can be saved as JSON with `--output` and compared with
+a previous run with `--compare`.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import PIL
+from PIL import Image, ImageDraw
+
+from .card_settings import Settings
+from .discord_card import RankCard
+from .executor import shutdown_executor
+from .process_pool import ProcessRenderer
+from .sandbox import Sandbox
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+
+class Case(NamedTuple):
+    """One benchmarked card method call"""
+
+    card_class: type
+    design: str
+    options: Dict[str, Any] = {}
+
+
+CASES: Dict[str, Case] = {
+    "card1": Case(RankCard, "card1"),
+    "card2": Case(RankCard, "card2"),
+    "card3": Case(RankCard, "card3"),
+    "card2_resize50": Case(RankCard, "card2", {"resize": 50}),
+    "card2_direct50": Case(RankCard, "card2", {"resize": 50, "direct": True}),
+    "custom_card1": Case(Sandbox, "custom_card1", {"card_colour": "#2a9d8f"}),
+    "custom_canvas": Case(Sandbox, "custom_canvas"),
+    "custom_canvas_plain": Case(Sandbox, "custom_canvas", {"has_background": False, "background_colour": "#264653", "avatar_frame": "circle"}),
+    "custom_canvas_extra_text": Case(Sandbox, "custom_canvas", {"extra_text": [["messages: 1.2K", (330, 40), 30, "white"]], "level_position": (700, 40)}),
+}
+
+USERNAMES = ["member%d" % i for i in range(32)]
+
+
+def synthetic_avatar(size: int = 512, seed: int = 0) -> Image.Image:
+    """returns a `size` x `size` RGBA avatar made of gradients"""
+    gradient = Image.linear_gradient("L").resize((size, size))
+    shift = (seed * 37) % 256
+    avatar = Image.merge("RGB", (gradient, gradient.rotate(90), gradient.point(lambda x: (x + shift) % 256)))
+    ImageDraw.Draw(avatar).ellipse((size // 4, size // 4, size * 3 // 4, size * 3 // 4), fill=(240, 240, 240))
+    avatar.putalpha(255)
+    return avatar
+
+
+def synthetic_background(size=(1600, 600)) -> Image.Image:
+    """returns an RGB background made of gradients"""
+    gradient = Image.linear_gradient("L")
+    return Image.merge("RGB", (gradient.resize(size), gradient.rotate(90).resize(size), Image.radial_gradient("L").resize(size))).convert("RGB")
+
+
+def percentile(values: Sequence[float], percent: float) -> float:
+    """returns the `percent` percentile of `values` with linear interpolation"""
+    values = sorted(values)
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * percent / 100
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+class Benchmark:
+    """Runs the benchmark cases
+
+    Parameters
+    ----------
+    iterations: :class:`int`
+        Sequential renders measured per case. Default is `50`
+
+    warmup: :class:`int`
+        Renders per case before measuring, they fill the caches. Default is `5`
+
+    concurrency: :class:`Sequence[int]`
+        The number of renders in flight for the throughput runs. Default is `(1, 4, 16)`
+
+    processes: Optional[:class:`int`]
+        Renders in a :class:`ProcessRenderer` with that many workers instead of the thread pool. Default is `None`
+
+    Methods
+    -------
+    - `run`
+        runs every case and returns the results
+    """
+
+    __slots__ = ('iterations', 'warmup', 'concurrency', 'processes', 'settings', 'avatars', '_random', '_executor')
+
+    def __init__(self, iterations: int = 50, warmup: int = 5, concurrency: Sequence[int] = (1, 4, 16), processes: Optional[int] = None) -> None:
+        self.iterations = iterations
+        self.warmup = warmup
+        self.concurrency = tuple(concurrency)
+        self.processes = processes
+        self.settings = Settings(background=synthetic_background(), bar_color="#e9c46a", text_color="white")
+        self.avatars = [synthetic_avatar(seed=seed) for seed in range(8)]
+        self._random = random.Random(0)
+        self._executor = None
+
+    def _card(self, case: Case):
+        return case.card_class(
+            settings=self.settings,
+            avatar=self._random.choice(self.avatars),
+            level=self._random.randint(1, 150),
+            username=self._random.choice(USERNAMES),
+            current_exp=self._random.randint(0, 1000),
+            max_exp=1000,
+            rank=self._random.randint(1, 5000),
+            executor=self._executor
+        )
+
+    async def _render(self, case: Case) -> int:
+        image = await getattr(self._card(case), case.design)(**case.options)
+        return len(image) if isinstance(image, bytes) else len(image.getbuffer())
+
+    async def _latency(self, case: Case) -> Dict[str, Any]:
+        timings: List[float] = []
+        sizes: List[int] = []
+        for _ in range(self.iterations):
+            start = time.perf_counter()
+            sizes.append(await self._render(case))
+            timings.append((time.perf_counter() - start) * 1000)
+        return {
+            "mean": sum(timings) / len(timings),
+            "min": min(timings),
+            "p50": percentile(timings, 50),
+            "p90": percentile(timings, 90),
+            "p99": percentile(timings, 99),
+            "max": max(timings),
+        }, sum(sizes) // len(sizes)
+
+    async def _throughput(self, case: Case, concurrency: int) -> float:
+        total = max(self.iterations, concurrency * 4)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def render():
+            async with semaphore:
+                await self._render(case)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(render() for _ in range(total)))
+        return total / (time.perf_counter() - start)
+
+    async def _memory(self, case: Case) -> int:
+        # Python allocations only, Pillow's image buffers show up in `max_rss_bytes`
+        tracemalloc.start()
+        try:
+            for _ in range(min(self.iterations, 10)):
+                await self._render(case)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    async def _run_case(self, case: Case) -> Dict[str, Any]:
+        for _ in range(self.warmup):
+            await self._render(case)
+        latency, size = await self._latency(case)
+        return {
+            "latency_ms": latency,
+            "bytes": size,
+            "throughput": {str(concurrency): await self._throughput(case, concurrency) for concurrency in self.concurrency},
+            "tracemalloc_peak_bytes": await self._memory(case),
+        }
+
+    async def run(self, names: Optional[Sequence[str]] = None, progress=None) -> Dict[str, Any]:
+        """runs the cases `names` (default all of :data:`CASES`) and returns the results"""
+        names = list(names or CASES)
+        unknown = [name for name in names if name not in CASES]
+        if unknown:
+            raise ValueError(f"unknown cases {', '.join(unknown)}, choose from {', '.join(CASES)}")
+
+        results: Dict[str, Any] = {}
+        if self.processes:
+            self._executor = ProcessRenderer({"benchmark": self.settings}, max_workers=self.processes)
+            await self._executor.start()
+        try:
+            for name in names:
+                results[name] = await self._run_case(CASES[name])
+                if progress is not None:
+                    progress(name, results[name])
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+        return {"meta": self.meta(), "results": results}
+
+    def meta(self) -> Dict[str, Any]:
+        """returns the versions and parameters the results were measured with"""
+        try:
+            from importlib.metadata import version
+            library = version("discordlevelingcard")
+        except Exception:
+            library = "unknown"
+        max_rss = None
+        if resource is not None:
+            # kilobytes on linux, bytes on macOS
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+        return {
+            "library": library,
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+            "iterations": self.iterations,
+            "warmup": self.warmup,
+            "concurrency": list(self.concurrency),
+            "processes": self.processes,
+            "max_rss_bytes": max_rss,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }
+
+
+def _row(name: str, result: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    latency = result["latency_ms"]
+    throughput = "  ".join(f"{concurrency}:{value:7.1f}/s" for concurrency, value in result["throughput"].items())
+    row = f"{name:<26} p50 {latency['p50']:7.2f}ms  p90 {latency['p90']:7.2f}ms  p99 {latency['p99']:7.2f}ms  {result['bytes']:>8}B  {throughput}"
+    if baseline is not None:
+        row += f"  p50 x{latency['p50'] / baseline['latency_ms']['p50']:.2f} vs baseline"
+    return row
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m DiscordLevelingCard.benchmark", description="Benchmarks every design with synthetic local images.")
+    parser.add_argument("cases", nargs="*", help=f"cases to run, default all: {', '.join(CASES)}")
+    parser.add_argument("-n", "--iterations", type=int, default=50, help="sequential renders measured per case (default 50)")
+    parser.add_argument("--warmup", type=int, default=5, help="renders per case before measuring (default 5)")
+    parser.add_argument("-c", "--concurrency", default="1,4,16", help="comma separated renders in flight for the throughput runs (default 1,4,16)")
+    parser.add_argument("-p", "--processes", type=int, default=None, help="render in a ProcessRenderer with that many workers")
+    parser.add_argument("-o", "--output", help="save the results as JSON to this file")
+    parser.add_argument("--compare", help="a JSON file of a previous run to compare the p50 latency with")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+
+    def progress(name, result):
+        print(_row(name, result, baseline.get(name) if baseline else None), flush=True)
+
+    benchmark = Benchmark(args.iterations, args.warmup, [int(value) for value in args.concurrency.split(",") if value], args.processes)
+    try:
+        results = asyncio.run(benchmark.run(args.cases, progress))
+    except ValueError as error:
+        parser.error(str(error))
+    finally:
+        shutdown_executor()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple, Union
+
+from PIL import ImageColor, ImageFont
+
+from .font_cache import fonts, DEFAULT_FONT
+from .layout import Scale
+
+Colour = Union[str, Tuple[int, ...]]
+Point = Tuple[int, int]
+
+
+class _CanvasFields(NamedTuple):
+    has_background: bool = True
+    background_colour: str = "black"
+    canvas_size: Point = (1000, 333)
+    resize: int = 100
+    direct: bool = False
+    overlay: Optional[Tuple[Tuple[Point, Point, Colour, int], ...]] = (((1000-50, 333-50), (25, 25), "black", 200),)
+    avatar_frame: str = "curvedborder"
+    avatar_size: int = 260
+    avatar_position: Point = (53, 36)
+    text_font: str = "levelfont.otf"
+    username_position: Point = (330, 130)
+    username_font_size: int = 50
+    level_position: Point = (500, 40)
+    level_font_size: int = 50
+    exp_position: Point = (775, 130)
+    exp_font_size: int = 50
+    bar_exp: Optional[float] = None
+    exp_bar_width: int = 619
+    exp_bar_height: int = 50
+    exp_bar_background_colour: Colour = "white"
+    exp_bar_position: Point = (330, 235)
+    exp_bar_curve: int = 30
+    extra_text: Optional[Tuple[Tuple[str, Point, int, Colour], ...]] = None
+
+
+class CompiledCanvas(NamedTuple):
+    """The pixel geometry and fonts of a :class:`CanvasLayout` at its final size"""
+
+    canvas_size: Point
+    overlays: Tuple[Tuple[Point, Point, Tuple[int, int, int, int]], ...]
+    avatar_size: int
+    avatar_position: Point
+    username_position: Point
+    username_font: ImageFont.FreeTypeFont
+    level_position: Point
+    level_font: ImageFont.FreeTypeFont
+    exp_position: Point
+    exp_font: ImageFont.FreeTypeFont
+    extra_text: Tuple[Tuple[str, Point, ImageFont.FreeTypeFont, Tuple[int, ...]], ...]
+    stroke: int
+    bar_size: Point
+    bar_position: Point
+    bar_curve: int
+    bar_minimum: int
+    bar_background: Tuple[int, ...]
+
+
+def _point(name: str, value) -> Point:
+    try:
+        x, y = value
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a pair of numbers, not {value!r}") from None
+    return (x, y)
+
+
+def _positive(name: str, value) -> int:
+    if not isinstance(value, (int, float)) or value <= 0:
+        raise ValueError(f"{name} must be a positive number, not {value!r}")
+    return value
+
+
+def _colour(name: str, value) -> Colour:
+    if isinstance(value, str):
+        try:
+            ImageColor.getrgb(value)
+        except ValueError:
+            raise ValueError(f"{name} is not a colour: {value!r}") from None
+        return value
+    return tuple(value)
+
+
+class CanvasLayout(_CanvasFields):
+    """A validated, reusable layout of :meth:`Sandbox.custom_canvas`
+
+    Takes the same arguments as :meth:`Sandbox.custom_canvas` and checks them
+    once. Lists are turned into tuples, so a layout is immutable, hashable and
+    can be used as a cache key. The static part of the card (resized
+    background and overlays) is built once per layout and settings and a
+    render only draws the member and the texts.
+
+    ```py
+    layout = CanvasLayout(avatar_frame="circle", overlay=[[(950, 283), (25, 25), "black", 150]])
+    image = await card.custom_canvas(layout=layout)
+    ```
+
+    Methods
+    -------
+    - `compiled`
+        returns the layout's pixel geometry and fonts
+    """
+
+    __slots__ = ()
+
+    def __new__(
+        cls,
+        has_background: bool = True,
+        background_colour: str = "black",
+        canvas_size: Point = (1000, 333),
+        resize: int = 100,
+        direct: bool = False,
+        overlay=_CanvasFields._field_defaults["overlay"],
+        avatar_frame: str = "curvedborder",
+        avatar_size: int = 260,
+        avatar_position: Point = (53, 36),
+        text_font: str = "levelfont.otf",
+        username_position: Point = (330, 130),
+        username_font_size: int = 50,
+        level_position: Point = (500, 40),
+        level_font_size: int = 50,
+        exp_position: Point = (775, 130),
+        exp_font_size: int = 50,
+        bar_exp: Optional[float] = None,
+        exp_bar_width: int = 619,
+        exp_bar_height: int = 50,
+        exp_bar_background_colour: Colour = "white",
+        exp_bar_position: Point = (330, 235),
+        exp_bar_curve: int = 30,
+        extra_text=None
+    ) -> "CanvasLayout":
+        if overlay is not None:
+            overlay = tuple(
+                (_point("overlay size", x[0]), _point("overlay position", x[1]), _colour("overlay colour", x[2]), int(x[3]))
+                for x in overlay
+            )
+        if isinstance(extra_text, (list, tuple)):
+            extra_text = tuple(
+                (str(x[0]), _point("extra_text position", x[1]), _positive("extra_text font size", x[2]), _colour("extra_text colour", x[3]))
+                for x in extra_text
+            )
+        else:
+            extra_text = None
+
+        return super().__new__(
+            cls,
+            bool(has_background),
+            _colour("background_colour", background_colour),
+            _point("canvas_size", canvas_size),
+            _positive("resize", resize),
+            bool(direct),
+            overlay,
+            str(avatar_frame),
+            _positive("avatar_size", avatar_size),
+            _point("avatar_position", avatar_position),
+            str(text_font),
+            _point("username_position", username_position),
+            _positive("username_font_size", username_font_size),
+            _point("level_position", level_position),
+            _positive("level_font_size", level_font_size),
+            _point("exp_position", exp_position),
+            _positive("exp_font_size", exp_font_size),
+            bar_exp,
+            _positive("exp_bar_width", exp_bar_width),
+            _positive("exp_bar_height", exp_bar_height),
+            _colour("exp_bar_background_colour", exp_bar_background_colour),
+            _point("exp_bar_position", exp_bar_position),
+            exp_bar_curve,
+            extra_text
+        )
+
+    @property
+    def scale(self) -> Scale:
+        """The :class:`Scale` the card is composed at"""
+        return Scale.of(self.resize, self.direct)
+
+    def compiled(self) -> CompiledCanvas:
+        """returns the pixel geometry and the loaded fonts of the layout, computed once per layout"""
+        return _compile(self)
+
+
+def _rgba(colour: Colour) -> Tuple[int, ...]:
+    return colour if isinstance(colour, tuple) else ImageColor.getcolor(colour, "RGBA")
+
+
+@lru_cache(maxsize=128)
+def _compile(layout: CanvasLayout) -> CompiledCanvas:
+    scale = layout.scale
+    fontname = DEFAULT_FONT if layout.text_font == "levelfont.otf" else layout.text_font
+    return CompiledCanvas(
+        canvas_size=(scale.size(layout.canvas_size[0]), scale.size(layout.canvas_size[1])),
+        overlays=tuple(
+            ((scale.size(size[0]), scale.size(size[1])), scale.xy(position), _rgba(colour)[:3]+(alpha,))
+            for size, position, colour, alpha in layout.overlay or ()
+        ),
+        avatar_size=scale.size(layout.avatar_size),
+        avatar_position=scale.xy(layout.avatar_position),
+        username_position=scale.xy(layout.username_position),
+        username_font=fonts.get(fontname, scale.size(layout.username_font_size)),
+        level_position=scale.xy(layout.level_position),
+        level_font=fonts.get(fontname, scale.size(layout.level_font_size)),
+        exp_position=scale.xy(layout.exp_position),
+        exp_font=fonts.get(fontname, scale.size(layout.exp_font_size)),
+        extra_text=tuple(
+            (text, scale.xy(position), fonts.get(fontname, scale.size(size)), _rgba(colour))
+            for text, position, size, colour in layout.extra_text or ()
+        ),
+        stroke=scale.size(1),
+        bar_size=(scale.size(layout.exp_bar_width), scale.size(layout.exp_bar_height)),
+        bar_position=scale.xy(layout.exp_bar_position),
+        bar_curve=scale.px(layout.exp_bar_curve),
+        bar_minimum=scale.px(50),
+        bar_background=_rgba(layout.exp_bar_background_colour)
+    )
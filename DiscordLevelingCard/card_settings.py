@@ -1,7 +1,11 @@
-from io import BufferedIOBase, IOBase, BytesIO
+from io import BufferedIOBase, IOBase
 from os import PathLike
-from typing import Optional, Union
+from threading import Lock
+from typing import Optional, Tuple, Union
 from .error import InvalidImageType, InvalidImageUrl
+from .executor import run_in_executor
+from .http_session import fetch
+from .image_loader import image_limits, open_image, reduce_image
 from requests import get
 from PIL import Image
 
@@ -12,55 +16,145 @@ class Settings:
 
     Parameters
     ----------
-    background: :class:`Optional[Union[PathLike, BufferedIOBase, str]]`
-        The background image for the rank card. This can be a path to a file or a file-like object in `rb` mode or URL or HEX depending upon the card
+    background: :class:`Optional[Union[PathLike, BufferedIOBase, str, bytes, Image.Image]]`
+        The background image for the rank card. This can be a path to a file or a file-like object in `rb` mode or URL or the encoded image `bytes` or an already opened `PIL.Image` or HEX depending upon the card
 
     bar_color: :class:`Optional[str]`
         The color of the XP bar. This can be a hex code or a color name. Default is `white`
-    
+
     text_color: :class:`Optional[str]`
         The color of the text. This can be a hex code or a color name. Default is `white`
-    
+
     background_color: :class:`Optional[str]`
         The color of the background. This can be a hex code or a color name. Default is `#36393f`
 
+    lazy: :class:`bool`
+        Whether to defer loading and decoding the background until the first card is rendered. Default is `False`
+
+    background_size: Optional[:class:`Tuple[int, int]`]
+        The largest size the background is drawn at. A larger background is decoded and kept at a reduced scale
+        that is still at least twice this size. Raise it for a bigger `custom_canvas`, `None` keeps the full size. Default is `(1000, 333)`
+
     Attributes
     ----------
     - `background`
     - `bar_color`
     - `text_color`
     - `background_color`
+    - `background_size`
+    - `loaded`
+
+    Methods
+    -------
+    - `load`
+        Creates the settings without blocking the event loop
+
+    Raises
+    ------
+    - `ImageTooLarge`
+        If the background is larger than the limits of `image_limits`
     """
 
-    __slots__ = ('background', 'bar_color', 'text_color', 'background_color')
+    __slots__ = ('_background', '_source', '_lock', 'bar_color', 'text_color', 'background_color', 'background_size', '__weakref__')
 
     def __init__(
         self,
-        background: Optional[Union[PathLike, BufferedIOBase, str]]=None,
+        background: Optional[Union[PathLike, BufferedIOBase, str, bytes, Image.Image]]=None,
         background_color: Optional[str]= "#36393f",
         bar_color: Optional[str] = 'white',
-        text_color: Optional[str] = 'white'
+        text_color: Optional[str] = 'white',
+        lazy: bool = False,
+        background_size: Optional[Tuple[int, int]] = (1000, 333)
     ) -> None:
-        self.background = background
         self.bar_color = bar_color
         self.text_color = text_color
         self.background_color = background_color
+        self.background_size = background_size
+        self._lock = Lock()
+        self._background = None
+        self._source = None
+
+        if isinstance(background, IOBase):
+            if not (background.seekable() and background.readable() and background.mode == "rb"):
+                raise InvalidImageType(f"File buffer {background!r} must be seekable and readable and in binary mode")
+        elif not isinstance(background, (str, bytes, Image.Image)):
+            raise InvalidImageType(f"background must be a path or url or a file buffer, not {type(background)}")
+
+        if lazy:
+            self._source = background
+        else:
+            self._background = Settings._decode(background, background_size)
+
+    @classmethod
+    async def load(
+        cls,
+        background: Union[PathLike, BufferedIOBase, str, bytes, Image.Image],
+        background_color: Optional[str]= "#36393f",
+        bar_color: Optional[str] = 'white',
+        text_color: Optional[str] = 'white',
+        lazy: bool = False,
+        background_size: Optional[Tuple[int, int]] = (1000, 333)
+    ) -> "Settings":
+        """
+        Creates the settings without blocking the event loop. A URL background is downloaded
+        with the shared `aiohttp` session and the background is decoded in the executor
+
+        Parameters
+        ----------
+        same as :class:`Settings`, with `lazy` the background is only decoded when the first card is rendered
+
+        Returns
+        -------
+        :class:`Settings`
+        """
+        if isinstance(background, str) and background.startswith("http"):
+            background = await fetch(background, image_limits.max_bytes)
+        settings = cls(background, background_color, bar_color, text_color, lazy=True, background_size=background_size)
+        if not lazy:
+            await run_in_executor(None, Settings._resolve, settings)
+        return settings
+
+    @property
+    def background(self) -> Image.Image:
+        """The decoded background image, decoded on first use when the settings are lazy"""
+        if self._background is None:
+            with self._lock:
+                if self._background is None:
+                    self._background = Settings._decode(self._source, self.background_size)
+                    self._source = None
+        return self._background
+
+    @background.setter
+    def background(self, value: Image.Image) -> None:
+        with self._lock:
+            self._background = value
+            self._source = None
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the background has been decoded"""
+        return self._background is not None
+
+    def _resolve(self) -> Image.Image:
+        return self.background
+
+    @staticmethod
+    def _decode(background: Union[BufferedIOBase, str, bytes, Image.Image], size: Optional[Tuple[int, int]] = None) -> Image.Image:
+        if isinstance(background, Image.Image):
+            # decode now, renders read the background concurrently from the executor threads
+            background.load()
+            return background
 
-        if isinstance(self.background, IOBase):
-            if not (self.background.seekable() and self.background.readable() and self.background.mode == "rb"):
-                raise InvalidImageType(f"File buffer {self.background!r} must be seekable and readable and in binary mode")
-            self.background = Image.open(self.background)
-        elif isinstance(self.background, str):
-            if self.background.startswith("http"):
-                self.background = Settings._image(self.background)
-            else:
-                self.background = Image.open(open(self.background, "rb"))
+        if isinstance(background, str) and background.startswith("http"):
+            background = Settings._image(background, size)
         else:
-            raise InvalidImageType(f"background must be a path or url or a file buffer, not {type(self.background)}") 
+            background = open_image(background, size, "background")
+        background.load()
+        return background if size is None else reduce_image(background, size)
 
     @staticmethod
-    def _image(url:str):
+    def _image(url:str, size: Optional[Tuple[int, int]] = None):
         response = get(url)
         if response.status_code != 200:
             raise InvalidImageUrl(f"Invalid image url: {url}")
-        return Image.open(BytesIO(response.content))
+        return open_image(response.content, size, "background")
@@ -1,11 +1,33 @@
 from io import BytesIO
-from typing import Optional, Union
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Iterable, Optional, Tuple, Union
 
-from aiohttp import ClientSession
-from PIL import Image, ImageDraw, ImageFont
-from .error import InvalidImageUrl
-from pathlib import Path
+from PIL import Image, ImageDraw
 from .card_settings import Settings
+from .asset_registry import registry
+from .font_cache import fonts, DEFAULT_FONT
+from .executor import run_in_executor
+from .http_session import fetch
+from .avatar_cache import MaskedAvatar, avatar_cache, prepare_avatar
+from .layer_cache import base_layers
+from .layout import Scale
+from .member_cache import member_cache
+from .text_cache import text_cache
+from .bar_cache import bar_cache
+from . import batch
+from .output import Output, get_default_output
+from .process_pool import ProcessRenderer, RenderJob, encode_avatar
+from .timings import RenderTimings, stage, timed
+from .image_loader import image_limits, open_image
+from .discord_cdn import avatar_url
+from .error import InvalidImageUrl
+from .animated import is_animated, render_animated
+from .render_cache import render_cache
+from .single_flight import renders
+from .scheduler import RenderScheduler
+
+# card1 is drawn at the 638x327 size of its overlay and saved at 505x259
+CARD1_NATIVE = 505 / 638
 
 class RankCard:
     """Class for creating a rank cards
@@ -33,6 +55,19 @@ class RankCard:
     rank: Optional[:class:`int`]
         The rank of the member. Default is `None`
 
+    executor: Optional[:class:`Union[Executor, ProcessRenderer]`]
+        The executor the card is rendered in, so the event loop is only used to fetch the avatar.
+        A :class:`ProcessRenderer` renders the card in its worker processes instead.
+        Default is `None` which uses the executor shared by every card (see `set_executor`)
+
+    timings_hook: Optional[:class:`Callable[[RenderTimings], None]`]
+        Called after every render with the :class:`RenderTimings` of its stages (download, decode, resize, drawing, encode) and byte sizes.
+        Default is `None`
+
+    scheduler: Optional[:class:`RenderScheduler`]
+        Bounds the renders running and waiting at once, a render is rejected when its queue is full
+        and dropped when it waited past its deadline. Default is `None` which renders right away
+
     Attributes
     ----------
     - `settings`
@@ -42,6 +77,9 @@ class RankCard:
     - `current_exp`
     - `max_exp`
     - `rank`
+    - `executor`
+    - `timings_hook`
+    - `scheduler`
 
     Methods
     -------
@@ -58,10 +96,16 @@ class RankCard:
         If the image type is not supported
     - `InvalidImageUrl`
         If the image url is invalid
+    - `RenderQueueFull`
+        If the queue of the `scheduler` is full
+    - `RenderDeadlineExceeded`
+        If the render waited for the `scheduler` past its deadline
 
     """
 
-    __slots__ = ('background', 'rank', 'background_color', 'text_color', 'bar_color', 'settings', 'avatar', 'level', 'username', 'current_exp', 'max_exp')
+    __slots__ = ('rank', 'background_color', 'text_color', 'bar_color', 'settings', 'avatar', 'level', 'username', 'current_exp', 'max_exp', 'executor', 'timings_hook', 'scheduler')
+
+    _designs = ("card1", "card2", "card3")
 
 
 
@@ -73,9 +117,12 @@ class RankCard:
         username:str,
         current_exp:int,
         max_exp:int,
-        rank:Optional[int] = None
+        rank:Optional[int] = None,
+        executor:Optional[Union[Executor, ProcessRenderer]] = None,
+        timings_hook:Optional[Callable[[RenderTimings], None]] = None,
+        scheduler:Optional[RenderScheduler] = None
     )-> None:
-        self.background = settings.background
+        self.settings = settings
         self.background_color = settings.background_color
         self.avatar = avatar
         self.level = level
@@ -85,6 +132,13 @@ class RankCard:
         self.max_exp = max_exp
         self.bar_color = settings.bar_color
         self.text_color = settings.text_color
+        self.executor = executor
+        self.timings_hook = timings_hook
+        self.scheduler = scheduler
+
+    @property
+    def background(self) -> Image.Image:
+        return self.settings.background
 
     @staticmethod
     def _convert_number(number: int) -> str:
@@ -98,16 +152,239 @@ class RankCard:
             return str(number)
 
     @staticmethod
-    async def _image(url:str):
-        async with ClientSession()   as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    raise InvalidImageUrl(f"Invalid image url: {url}")
-                data = await response.read()
-                return Image.open(BytesIO(data))
+    async def _fetch(url:str) -> bytes:
+        return await fetch(url, image_limits.max_bytes)
+
+    @staticmethod
+    async def _fetch_avatar(url: str, size: int) -> bytes:
+        sized = avatar_url(url, size)
+        try:
+            return await RankCard._fetch(sized)
+        except InvalidImageUrl:
+            if sized == url:
+                raise
+            # the CDN refused the size, the avatar as it was given
+            return await RankCard._fetch(url)
+
+    @staticmethod
+    async def _image(url:str, size: Optional[int] = None):
+        if size is None:
+            return open_image(await RankCard._fetch(url), name="avatar")
+        return open_image(await RankCard._fetch_avatar(url, size), (size, size), "avatar")
+
+    async def _avatar(self, size: int, frame: str, timings: Optional[RenderTimings] = None) -> MaskedAvatar:
+        if isinstance(self.avatar, str) and self.avatar.startswith("http"):
+            avatar = avatar_cache.get(self.avatar, size, frame)
+            if avatar is None:
+                if timings is None:
+                    image = await RankCard._image(self.avatar, size)
+                else:
+                    with timings.stage("avatar_fetch"):
+                        data = await RankCard._fetch_avatar(self.avatar, size)
+                    timings.sizes["avatar"] = len(data)
+                    image = open_image(data, (size, size), "avatar")
+                avatar = await self._run(timings, prepare_avatar, image, size, frame)
+                avatar_cache.put(self.avatar, size, frame, avatar)
+            return avatar
+        elif isinstance(self.avatar, Image.Image):
+            return await self._run(timings, prepare_avatar, self.avatar, size, frame)
+        raise TypeError(f"avatar must be a url, not {type(self.avatar)}")
+
+    async def _animated_avatar(self, size: int, frame: str, timings: Optional[RenderTimings] = None) -> Optional[Image.Image]:
+        # the avatar when it is animated, a still url avatar is prepared into the avatar cache instead of being downloaded twice
+        if isinstance(self.avatar, Image.Image):
+            return self.avatar if is_animated(self.avatar) else None
+        if not (isinstance(self.avatar, str) and self.avatar.startswith("http")):
+            raise TypeError(f"avatar must be a url, not {type(self.avatar)}")
+        if avatar_cache.get(self.avatar, size, frame) is not None:
+            return None
+        data = avatar_cache.get_animated(self.avatar, size)
+        if data is None:
+            with timed(timings, "avatar_fetch"):
+                data = await RankCard._fetch_avatar(self.avatar, size)
+            if timings is not None:
+                timings.sizes["avatar"] = len(data)
+        image = open_image(data, (size, size), "avatar")
+        if is_animated(image):
+            # kept encoded, every render decodes its own frames
+            avatar_cache.put_animated(self.avatar, size, data)
+            return image
+        avatar_cache.put(self.avatar, size, frame, await self._run(timings, prepare_avatar, image, size, frame))
+        return None
+
+    async def _run(self, timings: Optional[RenderTimings], func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        if timings is None:
+            return await run_in_executor(self.executor, func, *args, **kwargs)
+        return await run_in_executor(self.executor, timings.run(func, *args, **kwargs))
+
+    @staticmethod
+    def _avatar_frame(design: str, options: dict) -> Tuple[int, str]:
+        if design == "card1":
+            return Scale.of(options["resize"], options["direct"], CARD1_NATIVE).size(170), "circle"
+        return Scale.of(options["resize"], options["direct"]).size(260), "curvedborder"
+
+    @staticmethod
+    def _avatar_box(design: str, options: dict) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        """returns where the avatar is pasted and the size of the canvas it is pasted on"""
+        if design == "card1":
+            scale = Scale.of(options["resize"], options["direct"], CARD1_NATIVE)
+            return scale.xy((13, 65)), scale.canvas((638, 327), (505, 259))
+        scale = Scale.of(options["resize"], options["direct"])
+        return scale.xy((53, 73//2)), (scale.size(1000), scale.size(333))
+
+    @staticmethod
+    def _options(design: str, options: dict) -> dict:
+        return options
 
+    def _numbers(self, resize: int, direct: bool, output: Optional[Output]) -> tuple:
+        # a card rendered full size is shared by every `resize`, only its last encoded card depends on it
+        return (self.level, self.rank, self.current_exp, self.max_exp, self.bar_color, resize, direct, output)
 
-    async def card1(self, resize: int = 100)-> Union[None, bytes]:
+    @classmethod
+    def render_many(
+        cls,
+        settings: Settings,
+        members: Iterable[Dict[str, Any]],
+        design: str = "card1",
+        concurrency: int = 8,
+        executor: Optional[Union[Executor, ProcessRenderer]] = None,
+        return_exceptions: bool = False,
+        **options: Any
+    ) -> AsyncIterator[Tuple[Dict[str, Any], Union[BytesIO, BaseException]]]:
+        """
+        Renders the same design for many members and yields `(member, image)` as soon as each card is done
+
+        Fonts, the base layer and the avatars of members sharing an avatar url are shared by the whole batch,
+        every card is rendered like its card method (render cache, scheduler, timings hook, animated `output`)
+
+        Parameters
+        ----------
+        settings: :class:`Settings`
+            The settings for every card
+
+        members: :class:`Iterable[dict]`
+            The keyword arguments of every card, eg `{"avatar": url, "level": 1, "username": "name", "current_exp": 1, "max_exp": 10}`.
+            `rank` is optional
+
+        design: :class:`str`
+            The card method to render, one of `card1`, `card2`, `card3`. Default is `card1`
+
+        concurrency: :class:`int`
+            The maximum number of cards rendered (and avatars downloaded) at once. Default is `8`
+
+        executor: Optional[:class:`Union[Executor, ProcessRenderer]`]
+            The executor the cards are rendered in. Default is `None`
+
+        return_exceptions: :class:`bool`
+            Whether a failed card is yielded as `(member, exception)` instead of raising. Default is `False`
+
+        options:
+            The keyword arguments of the card method, eg `resize=50`
+
+        Returns
+        -------
+        an async iterator of `(member, image)` in completion order
+
+        ```py
+        async for member, image in RankCard.render_many(settings, members, design="card1"):
+            ...
+        ```
+        """
+        return batch.render_many(cls, settings, members, design, concurrency, executor, return_exceptions, **options)
+
+    async def _render(self, design: str, **options) -> Union[BytesIO, bytes]:
+        if self.timings_hook is None:
+            return await self._render_timed(design, None, **options)
+        timings = RenderTimings(design)
+        try:
+            result = await self._render_timed(design, timings, **options)
+        except BaseException as error:
+            self.timings_hook(timings.finish(error))
+            raise
+        timings.sizes["output"] = len(result) if isinstance(result, bytes) else len(result.getbuffer())
+        self.timings_hook(timings.finish())
+        return result
+
+    async def _render_timed(self, design: str, timings: Optional[RenderTimings], **options) -> Union[BytesIO, bytes]:
+        options["output"] = options.get("output") or get_default_output()
+        # identical cards rendered at the same time are rendered once, every caller gets its own `BytesIO`
+        with timed(timings, "single_flight"):
+            data = await renders.run(self._flight_key(design, options), lambda: self._render_cached(design, timings, options))
+        return data if options["output"].as_bytes else BytesIO(data)
+
+    def _flight_key(self, design: str, options: dict) -> Hashable:
+        avatar = self.avatar if isinstance(self.avatar, str) else id(self.avatar)
+        return (
+            type(self).__name__, design, tuple(sorted(options.items())), self.settings, avatar,
+            self.username, self.level, self.rank, self.current_exp, self.max_exp, self.text_color, self.bar_color,
+            # a caller joining a render uses its executor and scheduler, so only equal ones share it. A caller
+            # holding a slot of the scheduler renders in it, joining a render queued for that slot would never finish
+            self.executor, self.scheduler, self.scheduler is not None and self.scheduler.holding
+        )
+
+    async def _render_cached(self, design: str, timings: Optional[RenderTimings], options: dict) -> bytes:
+        key = None
+        if render_cache.enabled:
+            with timed(timings, "render_cache"):
+                key, data = await run_in_executor(None, render_cache.lookup, self, design, options)
+            if data is not None:
+                return data
+        # identical and stored cards never wait for a slot of the scheduler
+        if self.scheduler is None:
+            result = await self._draw(design, timings, options)
+        else:
+            result = await self.scheduler.run(self._draw(design, timings, options))
+        data = result if isinstance(result, bytes) else result.getvalue()
+        if key is not None:
+            with timed(timings, "render_cache"):
+                await run_in_executor(None, render_cache.put, key, data)
+        return data
+
+    async def _draw(self, design: str, timings: Optional[RenderTimings], options: dict) -> Union[BytesIO, bytes]:
+        if isinstance(self.executor, ProcessRenderer):
+            if isinstance(self.avatar, str) and self.avatar.startswith("http"):
+                with timed(timings, "avatar_fetch"):
+                    avatar = await RankCard._fetch_avatar(self.avatar, self._avatar_frame(design, options)[0])
+            elif isinstance(self.avatar, Image.Image):
+                with timed(timings, "avatar_encode"):
+                    avatar = await run_in_executor(None, encode_avatar, self.avatar)
+            else:
+                raise TypeError(f"avatar must be a url, not {type(self.avatar)}")
+            job = RenderJob(
+                design=design,
+                settings=self.executor.name_of(self.settings),
+                avatar=avatar,
+                username=self.username,
+                level=self.level,
+                current_exp=self.current_exp,
+                max_exp=self.max_exp,
+                rank=self.rank,
+                options=options
+            )
+            if timings is not None:
+                timings.sizes["avatar"] = len(avatar)
+            with timed(timings, "render"):
+                data = await self.executor.render(job)
+            return data if options["output"].as_bytes else BytesIO(data)
+
+        if options["output"].animated:
+            image = await self._animated_avatar(*self._avatar_frame(design, options), timings)
+            if image is not None:
+                return await self._run(timings, render_animated, self, design, image, options)
+
+        avatar = await self._avatar(*self._avatar_frame(design, options), timings)
+        return await self._run(timings, getattr(self, "_" + design), avatar, **options)
+
+    @staticmethod
+    def _save(background: Image.Image, resize: int, output: Optional[Output] = None) -> Union[BytesIO, bytes]:
+        if resize != 100:
+            with stage("resize"):
+                background = background.resize((int(background.size[0]*(resize/100)), int(background.size[1]*(resize/100))))
+        with stage("encode"):
+            return (output or get_default_output()).encode(background)
+
+
+    async def card1(self, resize: int = 100, direct: bool = False, output: Optional[Output] = None)-> Union[BytesIO, bytes]:
         """
         Creates the rank card and returns `bytes`
 
@@ -116,78 +393,85 @@ class RankCard:
         resize: :class:`int`
             The percentage to resize the image to. Default is 100
 
+        direct: :class:`bool`
+            Whether to compose the card directly at its `resize` size instead of rendering it full size and resizing it.
+            Faster for small cards, the text is laid out at the target size so it can differ by a pixel. Default is `False`
+
+        output: Optional[:class:`Output`]
+            How the card is encoded, eg `Output.webp(quality=80)` or `Output.fast_png(as_bytes=True)`. Default is `None` which uses `get_default_output()` (`PNG` in a `BytesIO`)
+
         Attributes
         ----------
         - `resize`
+        - `direct`
+        - `output`
         
         ![card](https://user-images.githubusercontent.com/77439837/234198272-3dcaabb0-0f38-4d51-9938-de4b0ad42123.png)
         """
-        path = str(Path(__file__).parent)
-
-        if isinstance(self.avatar, str):
-            if self.avatar.startswith("http"):
-                self.avatar = await RankCard._image(self.avatar)
-        elif isinstance(self.avatar, Image.Image):
-            pass
-        else:
-            raise TypeError(f"avatar must be a url, not {type(self.avatar)}") 
-
-        self.avatar = self.avatar.resize((170,170))
-
-        overlay = Image.open(path + "/assets/overlay1.png")
-        background = Image.new("RGBA", overlay.size)
-        backgroundover = self.background.resize((638,159))
+        return await self._render("card1", resize=resize, direct=direct, output=output)
+
+    def _card1_base(self, scale: Scale) -> Image.Image:
+        size = scale.canvas((638, 327), (505, 259))
+        overlay = registry.image("overlay1.png")
+        if overlay.size != size:
+            overlay = overlay.resize(size)
+        background = Image.new("RGBA", size)
+        backgroundover = self.background.resize((size[0], scale.size(159)))
         background.paste(backgroundover,(0,0))
-        
-        self.background = background.resize(overlay.size)
-        self.background.paste(overlay,(0,0),overlay)
+        background.paste(overlay,(0,0),overlay)
+        return background
+
+    def _card1(self, avatar: MaskedAvatar, resize: int, direct: bool = False, output: Optional[Output] = None) -> Union[BytesIO, bytes]:
+        scale = Scale.of(resize, direct, CARD1_NATIVE)
+        base = base_layers.get(self.settings, ("card1", scale), lambda: self._card1_base(scale))
+        return member_cache.render(
+            member_cache.key(self, ("card1", scale)), base, self._numbers(resize, direct, output),
+            lambda: self._card1_member(base, avatar, scale),
+            lambda background: self._card1_progress(background, scale, resize, direct, output)
+        )
+
+    def _card1_member(self, base: Image.Image, avatar: MaskedAvatar, scale: Scale) -> Image.Image:
+        background = base.copy()
+
+        myFont = fonts.get(DEFAULT_FONT, scale.size(40))
+        draw = ImageDraw.Draw(background)
 
-        myFont = ImageFont.truetype(path + "/assets/levelfont.otf",40)
-        draw = ImageDraw.Draw(self.background)
+        text_cache.draw(draw, scale.xy((205,(327/2)+20)), self.username,font=myFont, fill=self.text_color,stroke_width=scale.size(1),stroke_fill=(0, 0, 0))
+        background.paste(avatar.image, scale.xy((13, 65)), avatar.mask)
+        return background
 
-        draw.text((205,(327/2)+20), self.username,font=myFont, fill=self.text_color,stroke_width=1,stroke_fill=(0, 0, 0))
-        bar_exp = (self.current_exp/self.max_exp)*420
-        if bar_exp <= 50:
-            bar_exp = 50    
+    def _card1_progress(self, background: Image.Image, scale: Scale, resize: int, direct: bool, output: Optional[Output]) -> Union[BytesIO, bytes]:
+        stroke = scale.size(1)
+        draw = ImageDraw.Draw(background)
+
+        bar_exp = (self.current_exp/self.max_exp)*scale.px(420)
+        if bar_exp <= scale.px(50):
+            bar_exp = scale.px(50)
 
         current_exp = RankCard._convert_number(self.current_exp)
         
         max_exp = RankCard._convert_number(self.max_exp)
         
-        myFont = ImageFont.truetype(path + "/assets/levelfont.otf",30)
-        draw.text((197,(327/2)+125), f"LEVEL - {RankCard._convert_number(self.level)}",font=myFont, fill=self.text_color,stroke_width=1,stroke_fill=(0, 0, 0))
+        myFont = fonts.get(DEFAULT_FONT, scale.size(30))
+        text_cache.draw(draw, scale.xy((197,(327/2)+125)), f"LEVEL - {RankCard._convert_number(self.level)}",font=myFont, fill=self.text_color,stroke_width=stroke,stroke_fill=(0, 0, 0))
 
         w,_ = draw.textsize(f"{current_exp}/{max_exp}", font=myFont)
-        draw.text((638-w-50,(327/2)+125), f"{current_exp}/{max_exp}",font=myFont, fill=self.text_color,stroke_width=1,stroke_fill=(0, 0, 0))
+        text_cache.draw(draw, (scale.px(638-50)-w,scale.px((327/2)+125)), f"{current_exp}/{max_exp}",font=myFont, fill=self.text_color,stroke_width=stroke,stroke_fill=(0, 0, 0))
 
-        mask_im = Image.open(path + "/assets/mask_circle.jpg").convert('L').resize((170,170))
-        new = Image.new("RGB", self.avatar.size, (0, 0, 0))
-        try:
-            new.paste(self.avatar, mask=self.avatar.convert("RGBA").split()[3])
-        except Exception as e:
-            print(e)
-            new.paste(self.avatar, (0,0))
-        self.background.paste(new, (13, 65), mask_im)
-
-        im = Image.new("RGB", (490, 51), (0, 0, 0))
-        draw = ImageDraw.Draw(im, "RGBA")
-        draw.rounded_rectangle((0, 0, 420, 50), 30, fill=(255,255,255,50))
-        if self.current_exp != 0:
-            draw.rounded_rectangle((0, 0, bar_exp, 50), 30, fill=self.bar_color)
-        self.background.paste(im, (190, 235))
-        new = Image.new("RGBA", self.background.size)
-        new.paste(self.background,(0, 0), Image.open(path + "/assets/curvedoverlay.png").convert("L"))
-        self.background = new.resize((505, 259))
-
-        image = BytesIO()
-        if resize != 100:
-            self.background = self.background.resize((int(self.background.size[0]*(resize/100)), int(self.background.size[1]*(resize/100))))
-        self.background.save(image, 'PNG')
-        image.seek(0)
-        return image
+        bar = bar_cache.get("RGB", (scale.size(490), scale.size(51)), (0, 0, 0), scale.px(420), scale.px(50), scale.px(30), (255,255,255,50))
+        im = bar.render(bar_exp, self.bar_color) if self.current_exp != 0 else bar.track
+        background.paste(im, scale.xy((190, 235)))
+        new = Image.new("RGBA", background.size)
+        new.paste(background,(0, 0), registry.mask("curvedoverlay.png", background.size))
+        if direct:
+            return RankCard._save(new, 100, output)
+        with stage("resize"):
+            background = new.resize((505, 259))
+
+        return RankCard._save(background, resize, output)
 
 
-    async def card2(self, resize: int = 100)-> Union[None, bytes]:
+    async def card2(self, resize: int = 100, direct: bool = False, output: Optional[Output] = None)-> Union[BytesIO, bytes]:
         """
         Creates the rank card and returns `bytes`
 
@@ -196,38 +480,50 @@ class RankCard:
         resize: :class:`int`
             The percentage to resize the image to. Default is 100
 
+        direct: :class:`bool`
+            Whether to compose the card directly at its `resize` size instead of rendering it full size and resizing it.
+            Faster for small cards, the text is laid out at the target size so it can differ by a pixel. Default is `False`
+
+        output: Optional[:class:`Output`]
+            How the card is encoded, eg `Output.webp(quality=80)` or `Output.fast_png(as_bytes=True)`. Default is `None` which uses `get_default_output()` (`PNG` in a `BytesIO`)
+
         Attributes
         ----------
         - `resize`
+        - `direct`
+        - `output`
         
         ![card](https://user-images.githubusercontent.com/77439837/234198354-315e9420-9bd7-47bd-87ed-b21c3772646c.png)
         """
-        path = str(Path(__file__).parent)
+        return await self._render("card2", resize=resize, direct=direct, output=output)
 
-        if isinstance(self.avatar, str):
-            if self.avatar.startswith("http"):
-                self.avatar = await RankCard._image(self.avatar)
-        elif isinstance(self.avatar, Image.Image):
-            pass
-        else:
-            raise TypeError(f"avatar must be a url, not {type(self.avatar)}") 
+    def _card2_base(self, scale: Scale) -> Image.Image:
+        background = Image.new("RGB", (scale.size(1000), scale.size(333)), self.background_color)
+        background.paste(Image.new("RGB", (scale.size(950), scale.size(333-50)), "#2f3136"), scale.xy((25, 25)) )
+        return background
 
-        background = Image.new("RGB", (1000, 333), self.background_color)
-        background.paste(Image.new("RGB", (950, 333-50), "#2f3136"), (25, 25) )
+    def _card2(self, avatar: MaskedAvatar, resize: int, direct: bool = False, output: Optional[Output] = None) -> Union[BytesIO, bytes]:
+        scale = Scale.of(resize, direct)
+        base = base_layers.get(self.settings, ("card2", scale), lambda: self._card2_base(scale))
+        return member_cache.render(
+            member_cache.key(self, ("card2", scale)), base, self._numbers(resize, direct, output),
+            lambda: self._card2_member(base, avatar, scale),
+            lambda background: self._card2_progress(background, scale, resize, direct, output)
+        )
 
-        avatar = self.avatar.resize((260, 260))
+    def _card2_member(self, base: Image.Image, avatar: MaskedAvatar, scale: Scale) -> Image.Image:
+        background = base.copy()
 
-        mask = Image.open(path + "/assets/curveborder.png").resize((260, 260))
+        background.paste(avatar.image, scale.xy((53, 73//2)), avatar.mask)
 
-        new = Image.new("RGBA", avatar.size, (0, 0, 0))
-        try:
-            new.paste(avatar, mask=avatar.convert("RGBA").split()[3])
-        except:
-            new.paste(avatar, (0,0))
-        
-        background.paste(new, (53, 73//2), mask.convert("L"))
+        myFont = fonts.get(DEFAULT_FONT, scale.size(50))
+        draw = ImageDraw.Draw(background)
+        text_cache.draw(draw, scale.xy((330,130)), self.username,font=myFont, fill=self.text_color,stroke_width=scale.size(1),stroke_fill=(0, 0, 0))
+        return background
 
-        myFont = ImageFont.truetype(path + "/assets/levelfont.otf",50)
+    def _card2_progress(self, background: Image.Image, scale: Scale, resize: int, direct: bool, output: Optional[Output]) -> Union[BytesIO, bytes]:
+        stroke = scale.size(1)
+        myFont = fonts.get(DEFAULT_FONT, scale.size(50))
         draw = ImageDraw.Draw(background)
 
         if self.rank is not None:
@@ -235,34 +531,24 @@ class RankCard:
         else:
             combined = "LEVEL: " + self._convert_number(self.level)
         w = draw.textlength(combined, font=myFont)
-        draw.text((950-w,40), combined,font=myFont, fill=self.text_color,stroke_width=1,stroke_fill=(0, 0, 0))
-        draw.text((330,130), self.username,font=myFont, fill=self.text_color,stroke_width=1,stroke_fill=(0, 0, 0))
+        text_cache.draw(draw, (scale.px(950)-w,scale.px(40)), combined,font=myFont, fill=self.text_color,stroke_width=stroke,stroke_fill=(0, 0, 0))
 
         exp = f"{self._convert_number(self.current_exp)}/{self._convert_number(self.max_exp)}"
         w = draw.textlength(exp, font=myFont)
-        draw.text((950-w,130), exp,font=myFont, fill=self.text_color,stroke_width=1,stroke_fill=(0, 0, 0))
+        text_cache.draw(draw, (scale.px(950)-w,scale.px(130)), exp,font=myFont, fill=self.text_color,stroke_width=stroke,stroke_fill=(0, 0, 0))
 
-        bar_exp = (self.current_exp/self.max_exp)*619
-        if bar_exp <= 50:
-            bar_exp = 50  
+        bar_exp = (self.current_exp/self.max_exp)*scale.px(619)
+        if bar_exp <= scale.px(50):
+            bar_exp = scale.px(50)
 
-        im = Image.new("RGB", (620, 51), "#2f3136")
-        draw = ImageDraw.Draw(im, "RGBA")
-        draw.rounded_rectangle((0, 0, 619, 50), 30, fill=(255,255,255,50))
+        bar = bar_cache.get("RGB", (scale.size(620), scale.size(51)), "#2f3136", scale.px(619), scale.px(50), scale.px(30), (255,255,255,50))
+        im = bar.render(bar_exp, self.bar_color) if self.current_exp != 0 else bar.track
         
-        if self.current_exp != 0:
-            draw.rounded_rectangle((0, 0, bar_exp, 50), 30, fill=self.bar_color)
-        
-        background.paste(im, (330, 235))
+        background.paste(im, scale.xy((330, 235)))
 
-        image = BytesIO()
-        if resize != 100:
-            background = background.resize((int(background.size[0]*(resize/100)), int(background.size[1]*(resize/100))))
-        background.save(image, 'PNG')
-        image.seek(0)
-        return image
+        return RankCard._save(background, 100 if direct else resize, output)
 
-    async def card3(self, resize: int = 100)-> Union[None, bytes]:
+    async def card3(self, resize: int = 100, direct: bool = False, output: Optional[Output] = None)-> Union[BytesIO, bytes]:
         """
         Creates the rank card and returns `bytes`
 
@@ -271,38 +557,51 @@ class RankCard:
         resize: :class:`int`
             The percentage to resize the image to. Default is 100
 
+        direct: :class:`bool`
+            Whether to compose the card directly at its `resize` size instead of rendering it full size and resizing it.
+            Faster for small cards, the text is laid out at the target size so it can differ by a pixel. Default is `False`
+
+        output: Optional[:class:`Output`]
+            How the card is encoded, eg `Output.webp(quality=80)` or `Output.fast_png(as_bytes=True)`. Default is `None` which uses `get_default_output()` (`PNG` in a `BytesIO`)
+
         Attributes
         ----------
         - `resize`
+        - `direct`
+        - `output`
         
         ![card](https://user-images.githubusercontent.com/77439837/234203410-a6a970ef-c01c-454b-be67-6dc7c1b2c807.png)
         """
-        path = str(Path(__file__).parent)
+        return await self._render("card3", resize=resize, direct=direct, output=output)
 
-        if isinstance(self.avatar, str):
-            if self.avatar.startswith("http"):
-                self.avatar = await RankCard._image(self.avatar)
-        elif isinstance(self.avatar, Image.Image):
-            pass
-        else:
-            raise TypeError(f"avatar must be a url, not {type(self.avatar)}") 
+    def _card3_base(self, scale: Scale) -> Image.Image:
+        background = self.background.resize((scale.size(1000), scale.size(333)))
+        cut = Image.new("RGBA", (scale.size(950), scale.size(333-50)) , (0, 0, 0, 200))
+        background.paste(cut, scale.xy((25, 25)) ,cut)
+        return background
 
-        background = self.background.resize((1000, 333))
-        cut = Image.new("RGBA", (950, 333-50) , (0, 0, 0, 200))
-        background.paste(cut, (25, 25) ,cut)
+    def _card3(self, avatar: MaskedAvatar, resize: int, direct: bool = False, output: Optional[Output] = None) -> Union[BytesIO, bytes]:
+        scale = Scale.of(resize, direct)
+        base = base_layers.get(self.settings, ("card3", scale), lambda: self._card3_base(scale))
+        return member_cache.render(
+            member_cache.key(self, ("card3", scale)), base, self._numbers(resize, direct, output),
+            lambda: self._card3_member(base, avatar, scale),
+            lambda background: self._card3_progress(background, scale, resize, direct, output)
+        )
 
-        avatar = self.avatar.resize((260, 260))
+    def _card3_member(self, base: Image.Image, avatar: MaskedAvatar, scale: Scale) -> Image.Image:
+        background = base.copy()
 
-        mask = Image.open(path + "/assets/curveborder.png").resize((260, 260))
+        background.paste(avatar.image, scale.xy((53, 73//2)), avatar.mask)
 
-        new = Image.new("RGBA", avatar.size, (0, 0, 0))
-        try:
-            new.paste(avatar, mask=avatar.convert("RGBA").split()[3])
-        except:
-            new.paste(avatar, (0,0))
-        
-        background.paste(new, (53, 73//2), mask.convert("L"))
-        myFont = ImageFont.truetype(path + "/assets/levelfont.otf",50)
+        myFont = fonts.get(DEFAULT_FONT, scale.size(50))
+        draw = ImageDraw.Draw(background)
+        text_cache.draw(draw, scale.xy((330,130)), self.username,font=myFont, fill=self.text_color,stroke_width=scale.size(1),stroke_fill=(0, 0, 0))
+        return background
+
+    def _card3_progress(self, background: Image.Image, scale: Scale, resize: int, direct: bool, output: Optional[Output]) -> Union[BytesIO, bytes]:
+        stroke = scale.size(1)
+        myFont = fonts.get(DEFAULT_FONT, scale.size(50))
         draw = ImageDraw.Draw(background)
 
         if self.rank is not None:
@@ -310,28 +609,19 @@ class RankCard:
         else:
             combined = "LEVEL: " + self._convert_number(self.level)
         w = draw.textlength(combined, font=myFont)
-        draw.text((950-w,40), combined,font=myFont, fill=self.text_color,stroke_width=1,stroke_fill=(0, 0, 0))
-        draw.text((330,130), self.username,font=myFont, fill=self.text_color,stroke_width=1,stroke_fill=(0, 0, 0))
+        text_cache.draw(draw, (scale.px(950)-w,scale.px(40)), combined,font=myFont, fill=self.text_color,stroke_width=stroke,stroke_fill=(0, 0, 0))
 
         exp = f"{self._convert_number(self.current_exp)}/{self._convert_number(self.max_exp)}"
         w = draw.textlength(exp, font=myFont)
-        draw.text((950-w,130), exp,font=myFont, fill=self.text_color,stroke_width=1,stroke_fill=(0, 0, 0))
+        text_cache.draw(draw, (scale.px(950)-w,scale.px(130)), exp,font=myFont, fill=self.text_color,stroke_width=stroke,stroke_fill=(0, 0, 0))
 
-        bar_exp = (self.current_exp/self.max_exp)*619
-        if bar_exp <= 50:
-            bar_exp = 50  
+        bar_exp = (self.current_exp/self.max_exp)*scale.px(619)
+        if bar_exp <= scale.px(50):
+            bar_exp = scale.px(50)
 
-        im = Image.new("RGBA", (620, 51))
-        draw = ImageDraw.Draw(im, "RGBA")
-        draw.rounded_rectangle((0, 0, 619, 50), 30, fill=(255,255,255,225))
-        if self.current_exp != 0:
-            draw.rounded_rectangle((0, 0, bar_exp, 50), 30, fill=self.bar_color)
+        bar = bar_cache.get("RGBA", (scale.size(620), scale.size(51)), None, scale.px(619), scale.px(50), scale.px(30), (255,255,255,225))
+        im = bar.render(bar_exp, self.bar_color) if self.current_exp != 0 else bar.track
         
-        background.paste(im, (330, 235), im.convert("RGBA"))
+        background.paste(im, scale.xy((330, 235)), im)
 
-        image = BytesIO()
-        if resize != 100:
-            background = background.resize((int(background.size[0]*(resize/100)), int(background.size[1]*(resize/100))))
-        background.save(image, 'PNG')
-        image.seek(0)
-        return image
\ No newline at end of file
+        return RankCard._save(background, 100 if direct else resize, output)
@@ -0,0 +1,59 @@
+import re
+from typing import Iterable, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# hosts serving Discord avatars, both take a `size` query parameter
+CDN_HOSTS: Tuple[str, ...] = ("cdn.discordapp.com", "media.discordapp.net")
+# the sizes the CDN accepts
+CDN_SIZES: Tuple[int, ...] = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+# user avatars, guild member avatars and the default avatars
+_AVATAR_PATH = re.compile(r"^/(avatars/\d+|guilds/\d+/users/\d+/avatars|embed/avatars)/[^/]+\.(png|jpe?g|webp|gif)$")
+
+_enabled = True
+_hosts = CDN_HOSTS
+
+
+def set_cdn_sizing(enabled: bool, hosts: Optional[Iterable[str]] = None) -> None:
+    """sets whether Discord CDN avatar urls are rewritten to the size the design draws them at
+
+    Parameters
+    ----------
+    enabled: :class:`bool`
+        `False` downloads every avatar url as it is given. Enabled by default
+
+    hosts: Optional[:class:`Iterable[str]`]
+        The hosts (`host` or `host:port`) treated as the CDN, eg a caching proxy. Default is `None` which uses `CDN_HOSTS`
+    """
+    global _enabled, _hosts
+    _enabled = enabled
+    _hosts = CDN_HOSTS if hosts is None else tuple(hosts)
+
+
+def get_cdn_sizing() -> bool:
+    """returns whether Discord CDN avatar urls are rewritten to the size the design draws them at"""
+    return _enabled
+
+
+def cdn_size(size: int) -> int:
+    """returns the smallest size the CDN serves that is at least `size`"""
+    for cdn in CDN_SIZES:
+        if cdn >= size:
+            return cdn
+    return CDN_SIZES[-1]
+
+
+def avatar_url(url: str, size: int) -> str:
+    """returns the Discord CDN avatar `url` with its `size` set to the smallest CDN size of at least `size` pixels
+
+    Any other url, or every url when :func:`set_cdn_sizing` disabled it, is returned as it is.
+    The other query parameters (eg `animated`) are kept.
+    """
+    if not _enabled:
+        return url
+    parts = urlsplit(url)
+    if (parts.hostname not in _hosts and parts.netloc not in _hosts) or not _AVATAR_PATH.match(parts.path):
+        return url
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != "size"]
+    query.append(("size", str(cdn_size(size))))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
@@ -11,4 +11,24 @@ class InvalidImageType(DiscordLevelingCardError):
 class InvalidImageUrl(DiscordLevelingCardError):
     """Raised when the image URL is invalid"""
     def __init__(self, message: str):
-        super().__init__(message)
\ No newline at end of file
+        super().__init__(message)
+
+class ImageTooLarge(DiscordLevelingCardError):
+    """Raised when an avatar or background is larger than the limits of `image_limits`"""
+    def __init__(self, message: str):
+        super().__init__(message)
+
+class RenderQueueFull(DiscordLevelingCardError):
+    """Raised when the queue of a :class:`RenderScheduler` is full"""
+    def __init__(self, message: str):
+        super().__init__(message)
+
+class RenderDeadlineExceeded(DiscordLevelingCardError):
+    """Raised when a render waited in the queue of a :class:`RenderScheduler` past its deadline"""
+    def __init__(self, message: str):
+        super().__init__(message)
+
+class InvalidCardSpec(DiscordLevelingCardError):
+    """Raised when a card spec sent to the render server is invalid"""
+    def __init__(self, message: str):
+        super().__init__(message)
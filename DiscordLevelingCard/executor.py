@@ -0,0 +1,48 @@
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+from typing import Any, Callable, Optional
+
+_lock = Lock()
+_executor: Optional[Executor] = None
+
+
+def get_executor() -> Executor:
+    """returns the executor shared by every card, creating a `ThreadPoolExecutor` on first use"""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(thread_name_prefix="DiscordLevelingCard")
+    return _executor
+
+
+def set_executor(executor: Optional[Executor]) -> None:
+    """replaces the shared executor
+
+    Parameters
+    ----------
+    executor: :class:`Optional[Executor]`
+        The executor every card without its own executor renders in.
+        `None` brings back the default `ThreadPoolExecutor` on next use.
+        The previous executor is not shut down.
+    """
+    global _executor
+    with _lock:
+        _executor = executor
+
+
+def shutdown_executor(wait: bool = True) -> None:
+    """shuts down the shared executor, a new one is created on next use"""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+async def run_in_executor(executor: Optional[Executor], func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """runs `func` in `executor` (or the shared executor) without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor or get_executor(), partial(func, *args, **kwargs))
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from io import BytesIO
+from threading import Lock
+from typing import Dict, Tuple
+
+from PIL import ImageFont
+
+from .asset_registry import ASSETS_PATH
+
+DEFAULT_FONT = str(ASSETS_PATH / "levelfont.otf")
+
+
+class FontCache:
+    """Bounded cache of loaded fonts keyed by `(font path, size)`
+
+    The bytes of every font file are read from disk only once and the
+    FreeType faces built from them are kept in a least recently used cache.
+
+    Parameters
+    ----------
+    maxsize: :class:`int`
+        The maximum number of `(font path, size)` faces to keep. Default is `64`
+
+    Attributes
+    ----------
+    - `maxsize`
+
+    Methods
+    -------
+    - `get`
+        returns the font for the given path and size
+    - `clear`
+        drops every cached font
+    """
+
+    __slots__ = ('maxsize', '_lock', '_files', '_fonts')
+
+    def __init__(self, maxsize: int = 64) -> None:
+        self.maxsize = maxsize
+        self._lock = Lock()
+        self._files: Dict[str, bytes] = {}
+        self._fonts: "OrderedDict[Tuple[str, int], ImageFont.FreeTypeFont]" = OrderedDict()
+
+    def _read(self, path: str) -> bytes:
+        data = self._files.get(path)
+        if data is None:
+            with open(path, "rb") as file:
+                data = file.read()
+            with self._lock:
+                data = self._files.setdefault(path, data)
+        return data
+
+    def get(self, path: str = DEFAULT_FONT, size: int = 50) -> ImageFont.FreeTypeFont:
+        """returns the font at `path` with the given `size`"""
+        key = (str(path), int(size))
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self._fonts.move_to_end(key)
+                return font
+
+        font = ImageFont.truetype(BytesIO(self._read(key[0])), key[1])
+        with self._lock:
+            font = self._fonts.setdefault(key, font)
+            self._fonts.move_to_end(key)
+            while len(self._fonts) > self.maxsize:
+                self._fonts.popitem(last=False)
+        return font
+
+    def clear(self) -> None:
+        """drops every cached font and font file"""
+        with self._lock:
+            self._files.clear()
+            self._fonts.clear()
+
+
+fonts = FontCache()
@@ -0,0 +1,141 @@
+import asyncio
+from typing import Optional
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+from .error import ImageTooLarge, InvalidImageUrl
+from .single_flight import downloads
+
+# connection pool and timeouts of the session managed by the library
+LIMIT = 100
+LIMIT_PER_HOST = 10
+KEEPALIVE_TIMEOUT = 60
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 10
+
+_session: Optional[ClientSession] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_owned = False
+
+
+def create_session(
+    limit: int = LIMIT,
+    limit_per_host: int = LIMIT_PER_HOST,
+    keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+    connect_timeout: float = CONNECT_TIMEOUT,
+    read_timeout: float = READ_TIMEOUT
+) -> ClientSession:
+    """creates a keep-alive :class:`aiohttp.ClientSession` suited for downloading avatars and backgrounds
+
+    Parameters
+    ----------
+    limit: :class:`int`
+        The maximum number of open connections. Default is `100`
+
+    limit_per_host: :class:`int`
+        The maximum number of open connections to a single host. Default is `10`
+
+    keepalive_timeout: :class:`float`
+        Seconds an idle connection is kept open for reuse. Default is `60`
+
+    connect_timeout: :class:`float`
+        Seconds to wait for a connection to be established. Default is `5`
+
+    read_timeout: :class:`float`
+        Seconds to wait between two reads of the response. Default is `10`
+    """
+    return ClientSession(
+        connector=TCPConnector(limit=limit, limit_per_host=limit_per_host, keepalive_timeout=keepalive_timeout),
+        timeout=ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+    )
+
+
+def get_session() -> ClientSession:
+    """returns the session shared by every card, creating one on first use
+
+    Must be called from a running event loop, a new session is created if the
+    current one is closed or was created in another event loop. The session of
+    another event loop is closed on it while it runs, the one of a stopped or closed
+    loop is dropped without being closed, :func:`close_session` closes it properly.
+    """
+    global _session, _loop, _owned
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or (_owned and _loop is not loop):
+        if _session is not None and _owned and not _session.closed:
+            _discard(_session, _loop)
+        _session = create_session()
+        _loop = loop
+        _owned = True
+    return _session
+
+
+def _discard(session: ClientSession, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    # a session can only be closed on the event loop it was created in
+    if loop is not None and loop.is_running():
+        asyncio.run_coroutine_threadsafe(session.close(), loop)
+    # its loop is stopped or closed so nothing can be awaited on it: the session is only dropped and its
+    # connector leaked, its connections are closed when it is garbage collected (with a `ResourceWarning`).
+    # Call `close_session` before the loop closes to avoid it
+
+
+def set_session(session: Optional[ClientSession]) -> None:
+    """replaces the shared session
+
+    Parameters
+    ----------
+    session: :class:`Optional[aiohttp.ClientSession]`
+        The session every avatar and background is downloaded with. It is not closed
+        by :func:`close_session`. `None` brings back the managed session on next use.
+    """
+    global _session, _loop, _owned
+    _session = session
+    _loop = None
+    _owned = False
+
+
+async def close_session() -> None:
+    """closes the session managed by the library, call it when the bot shuts down"""
+    global _session, _owned
+    session, owned = _session, _owned
+    _session, _owned = None, False
+    if session is not None and owned and not session.closed:
+        await session.close()
+
+
+async def fetch(url: str, max_bytes: Optional[int] = None) -> bytes:
+    """downloads `url` with the shared session and returns the body
+
+    Concurrent downloads of the same url are made once and share the body.
+
+    Parameters
+    ----------
+    url: :class:`str`
+        The url to download
+
+    max_bytes: Optional[:class:`int`]
+        The largest body to download, the download stops as soon as it is exceeded. Default is `None`
+
+    Raises
+    ------
+    - `InvalidImageUrl`
+        If the response status is not `200`
+    - `ImageTooLarge`
+        If the body is larger than `max_bytes`
+    """
+    return await downloads.run((url, max_bytes), lambda: _download(url, max_bytes))
+
+
+async def _download(url: str, max_bytes: Optional[int]) -> bytes:
+    async with get_session().get(url) as response:
+        if response.status != 200:
+            raise InvalidImageUrl(f"Invalid image url: {url}")
+        if max_bytes is None:
+            return await response.read()
+        if response.content_length is not None and response.content_length > max_bytes:
+            raise ImageTooLarge(f"{url} is {response.content_length} bytes, the limit is {max_bytes} bytes")
+        body = bytearray()
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            body += chunk
+            if len(body) > max_bytes:
+                raise ImageTooLarge(f"{url} is larger than the limit of {max_bytes} bytes")
+        return bytes(body)
@@ -0,0 +1,116 @@
+import os
+from io import BytesIO, IOBase
+from typing import Optional, Tuple, Union
+
+from PIL import Image
+
+from .error import ImageTooLarge
+
+# an image is only reduced while it stays at least this many times larger than the size it is drawn at,
+# so the final resize still has enough pixels to antialias with (the same gap `Image.thumbnail` uses)
+REDUCING_GAP = 2
+
+
+class ImageLimits:
+    """The largest avatar or background the library downloads and decodes
+
+    An image over a limit raises :class:`ImageTooLarge` before it is decoded,
+    so a huge upload or a decompression bomb can not exhaust the memory of the
+    executor or the render workers.
+
+    Parameters
+    ----------
+    max_bytes: Optional[:class:`int`]
+        The largest encoded image in bytes, `None` disables the limit. Default is `16 MiB`
+
+    max_pixels: Optional[:class:`int`]
+        The largest decoded image in pixels (width x height), `None` disables the limit. Default is `25_000_000`
+
+    Attributes
+    ----------
+    - `max_bytes`
+    - `max_pixels`
+
+    Methods
+    -------
+    - `check_bytes`
+        raises if an encoded image is too large
+    - `check_pixels`
+        raises if an opened image is too large
+    """
+
+    __slots__ = ('max_bytes', 'max_pixels')
+
+    def __init__(self, max_bytes: Optional[int] = 16 * 1024 * 1024, max_pixels: Optional[int] = 25_000_000) -> None:
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+
+    def check_bytes(self, nbytes: int, name: str = "image") -> None:
+        """raises :class:`ImageTooLarge` if `nbytes` is over `max_bytes`"""
+        if self.max_bytes is not None and nbytes > self.max_bytes:
+            raise ImageTooLarge(f"{name} is {nbytes} bytes, the limit is {self.max_bytes} bytes")
+
+    def check_pixels(self, image: Image.Image, name: str = "image") -> None:
+        """raises :class:`ImageTooLarge` if the opened, not yet decoded `image` has more than `max_pixels` pixels"""
+        width, height = image.size
+        if self.max_pixels is not None and width * height > self.max_pixels:
+            raise ImageTooLarge(f"{name} is {width}x{height} pixels, the limit is {self.max_pixels} pixels")
+
+
+image_limits = ImageLimits()
+
+
+def _nbytes(source: Union[bytes, str, os.PathLike, IOBase]) -> Optional[int]:
+    if isinstance(source, bytes):
+        return len(source)
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if source.seekable():
+        position = source.tell()
+        size = source.seek(0, os.SEEK_END) - position
+        source.seek(position)
+        return size
+    return None
+
+
+def open_image(source: Union[bytes, str, os.PathLike, IOBase], size: Optional[Tuple[int, int]] = None, name: str = "image") -> Image.Image:
+    """opens an encoded image within the limits of `image_limits`
+
+    Parameters
+    ----------
+    source: :class:`Union[bytes, str, PathLike, BufferedIOBase]`
+        The encoded image, a path or a file object in `rb` mode
+
+    size: Optional[:class:`Tuple[int, int]`]
+        The largest size the image is drawn at. A `JPEG` is set to decode at the smallest
+        scale that is still `REDUCING_GAP` times this size. Default is `None` which decodes at full size
+
+    name: :class:`str`
+        What the image is, used in the error message
+
+    Raises
+    ------
+    - `ImageTooLarge`
+        If the image is over `image_limits`
+    """
+    nbytes = _nbytes(source)
+    if nbytes is not None:
+        image_limits.check_bytes(nbytes, name)
+    image = Image.open(BytesIO(source) if isinstance(source, bytes) else source)
+    image_limits.check_pixels(image, name)
+    if size is not None and image.format == "JPEG":
+        image.draft(None, (size[0]*REDUCING_GAP, size[1]*REDUCING_GAP))
+    return image
+
+
+def reduce_image(image: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    """returns the decoded `image` reduced by the largest integer factor that keeps it `REDUCING_GAP` times larger than `size`
+
+    A smaller image or an image in a mode that can not be averaged (`1`, `P`) is returned as it is.
+    """
+    if image.mode in ("1", "P"):
+        return image
+    factor = min(image.size[0] // (size[0]*REDUCING_GAP), image.size[1] // (size[1]*REDUCING_GAP))
+    if factor < 2:
+        return image
+    return image.reduce(factor)
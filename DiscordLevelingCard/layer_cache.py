@@ -0,0 +1,59 @@
+from threading import Lock
+from typing import Callable, Dict, Hashable, Tuple
+from weakref import WeakKeyDictionary
+
+from PIL import Image
+
+from .card_settings import Settings
+from .timings import stage
+
+
+class LayerCache:
+    """Cache of the static base layer of every design, per :class:`Settings`
+
+    The base layer is the part of a card that is the same for every member
+    (background, overlays and panels). It is built once per settings and
+    design, a render then only copies it and draws the member on top.
+    Layers are dropped together with their settings and rebuilt when the
+    background or `background_color` of the settings are changed.
+
+    Methods
+    -------
+    - `get`
+        returns the cached layer, building it on first use
+    - `clear`
+        drops every cached layer
+    """
+
+    __slots__ = ('_lock', '_layers')
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._layers: "WeakKeyDictionary[Settings, Dict[Hashable, Tuple[Hashable, Image.Image]]]" = WeakKeyDictionary()
+
+    def get(self, settings: Settings, key: Hashable, factory: Callable[[], Image.Image]) -> Image.Image:
+        """returns the layer `key` of `settings`, built with `factory` on first use
+
+        The returned image is shared, paste it or copy it but never draw on it.
+        """
+        version = (id(settings._background), settings.background_color)
+        with self._lock:
+            entry = self._layers.setdefault(settings, {}).get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        with stage("base"):
+            layer = factory()
+        # the factory may have decoded the background of lazy settings
+        version = (id(settings._background), settings.background_color)
+        with self._lock:
+            self._layers.setdefault(settings, {})[key] = (version, layer)
+        return layer
+
+    def clear(self) -> None:
+        """drops every cached layer"""
+        with self._lock:
+            self._layers.clear()
+
+
+base_layers = LayerCache()
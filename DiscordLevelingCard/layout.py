@@ -0,0 +1,98 @@
+from typing import Optional, Tuple, Union
+
+Number = Union[int, float]
+
+
+class Scale:
+    """Maps the coordinates of a design to the size the card is composed at
+
+    Designs are written in the pixel coordinates of their full size card.
+    With `direct` rendering every coordinate, size and font size goes through
+    a :class:`Scale` so the card is composed once at its final size instead of
+    being rendered full size and resampled. A factor of `1` leaves every value
+    untouched, so full size cards are pixel identical.
+
+    Parameters
+    ----------
+    factor: :class:`float`
+        The size of the composed card relative to the design. Default is `1.0`
+
+    resize: :class:`int`
+        The `resize` percentage the card is composed for. Default is `100`
+
+    Attributes
+    ----------
+    - `factor`
+    - `resize`
+
+    Methods
+    -------
+    - `of`
+        returns the scale of a card method call
+    - `px`
+        scales a coordinate
+    - `xy`
+        scales a point
+    - `size`
+        scales a length or font size, never below `1`
+    - `canvas`
+        returns the size the card is composed at
+    """
+
+    __slots__ = ('factor', 'resize')
+
+    def __init__(self, factor: float = 1.0, resize: int = 100) -> None:
+        self.factor = factor
+        self.resize = resize
+
+    @classmethod
+    def of(cls, resize: int, direct: bool, native: float = 1.0) -> "Scale":
+        """returns the scale of a card rendered with `resize` and `direct`
+
+        `native` is the size the design is saved at relative to the size it is
+        drawn at, eg `card1` is drawn at `638x327` and saved at `505x259`
+        """
+        if not direct:
+            return cls()
+        return cls(native * resize / 100, resize)
+
+    @property
+    def identity(self) -> bool:
+        """Whether the design is composed at its own size"""
+        return self.factor == 1
+
+    def px(self, value: Number) -> Number:
+        """returns the coordinate `value` at this scale"""
+        if self.identity:
+            return value
+        return round(value * self.factor)
+
+    def xy(self, point: Tuple[Number, Number]) -> Tuple[Number, Number]:
+        """returns the point `(x, y)` at this scale"""
+        return (self.px(point[0]), self.px(point[1]))
+
+    def size(self, value: Number) -> int:
+        """returns the length or font size `value` at this scale rounded down like `resize` does, at least `1`"""
+        if self.identity:
+            return max(1, int(value))
+        # the epsilon keeps eg 638 * (505 / 638) from rounding down to 504
+        return max(1, int(value * self.factor + 1e-6))
+
+    def canvas(self, size: Tuple[int, int], saved: Optional[Tuple[int, int]] = None) -> Tuple[int, int]:
+        """returns the size a design drawn at `size` is composed at
+
+        `saved` is the size the design is resized to before `resize` is applied,
+        a scaled card then has exactly the size the resized card would have
+        """
+        if self.identity or saved is None:
+            return (self.size(size[0]), self.size(size[1]))
+        return (max(1, int(saved[0]*(self.resize/100))), max(1, int(saved[1]*(self.resize/100))))
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Scale) and (other.factor, other.resize) == (self.factor, self.resize)
+
+    def __hash__(self) -> int:
+        return hash((self.factor, self.resize))
+
+    def __repr__(self) -> str:
+        return f"Scale({self.factor!r}, {self.resize!r})"
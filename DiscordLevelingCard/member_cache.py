@@ -0,0 +1,154 @@
+from collections import OrderedDict
+from io import BytesIO
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, List, Optional, Union
+
+from PIL import Image
+
+from .timings import stage
+
+
+class MemberCache:
+    """Least recently used cache of the last card of every member and design
+
+    A card is drawn in two parts: the member layer (the base layer with the
+    avatar and the username) and the progress (level, rank, exp text and the
+    XP bar). The member layer is kept per member, so when only the numbers of
+    a member changed the next card only draws the progress over a copy of it,
+    and a card whose numbers did not change at all is returned without being
+    drawn or encoded again.
+
+    Only members whose avatar is a url are cached, the url already changes
+    with the avatar. An entry is rebuilt when the base layer of its settings
+    was rebuilt.
+
+    Parameters
+    ----------
+    max_bytes: :class:`int`
+        The memory budget of the member layers and encoded cards in bytes, `0` disables the cache. Default is `64 MiB`
+
+    Attributes
+    ----------
+    - `max_bytes`
+    - `hits`
+        cards that did not draw the member layer
+    - `misses`
+    - `size`
+        The number of bytes currently used
+
+    Methods
+    -------
+    - `render`
+        renders a card, reusing the member layer and the last card
+    - `stats`
+        returns the counters as a `dict`
+    - `clear`
+        drops every cached member
+    """
+
+    __slots__ = ('max_bytes', 'hits', 'misses', 'size', '_lock', '_entries')
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self._lock = Lock()
+        # key -> [base layer, member layer, numbers of the last card, last card, bytes used]
+        self._entries: "OrderedDict[Hashable, List[Any]]" = OrderedDict()
+
+    @staticmethod
+    def key(card: Any, design: Hashable) -> Optional[Hashable]:
+        """returns the cache key of `card` rendered as `design`, `None` when the card can not be cached"""
+        if not (isinstance(card.avatar, str) and card.avatar.startswith("http")):
+            return None
+        return (type(card).__name__, design, card.settings, card.avatar, card.username, card.text_color)
+
+    def render(
+        self,
+        key: Optional[Hashable],
+        base: Image.Image,
+        numbers: Hashable,
+        member: Callable[[], Image.Image],
+        progress: Callable[[Image.Image], Union[BytesIO, bytes]]
+    ) -> Union[BytesIO, bytes]:
+        """renders a card
+
+        Parameters
+        ----------
+        key: Optional[:class:`Hashable`]
+            The key of the member from :meth:`key`, `None` renders without the cache
+
+        base: :class:`PIL.Image.Image`
+            The base layer the member layer is built on
+
+        numbers: :class:`Hashable`
+            Everything the progress depends on, eg the level and the exp
+
+        member: :class:`Callable`
+            Builds a new member layer on a copy of `base`
+
+        progress: :class:`Callable`
+            Draws the progress on the given copy of the member layer and encodes the card
+        """
+        if key is None or self.max_bytes <= 0:
+            with stage("member"):
+                layer = member()
+            with stage("progress"):
+                return progress(layer)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not base:
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                if entry[2] == numbers:
+                    return entry[3] if isinstance(entry[3], bytes) else BytesIO(entry[3].getvalue())
+                layer = entry[1]
+            else:
+                self.misses += 1
+                layer = None
+
+        if layer is None:
+            with stage("member"):
+                layer = member()
+        with stage("progress"):
+            result = progress(layer.copy())
+        last = result if isinstance(result, bytes) else BytesIO(result.getvalue())
+
+        nbytes = len(layer.getbands()) * layer.width * layer.height + len(last if isinstance(last, bytes) else last.getbuffer())
+        if nbytes <= self.max_bytes:
+            with self._lock:
+                if key in self._entries:
+                    self._remove(key)
+                self._entries[key] = [base, layer, numbers, last, nbytes]
+                self.size += nbytes
+                while self.size > self.max_bytes:
+                    self._remove(next(iter(self._entries)))
+        return result
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self.size -= entry[4]
+
+    def stats(self) -> Dict[str, int]:
+        """returns the cache counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def clear(self) -> None:
+        """drops every cached member, the counters are kept"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+member_cache = MemberCache()
@@ -0,0 +1,212 @@
+from io import BytesIO
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from PIL import Image
+
+FORMATS = ("PNG", "WEBP", "JPEG", "GIF", "APNG")
+ANIMATED_FORMATS = ("GIF", "APNG")
+# frames the shared palette of an animation is built from
+PALETTE_SAMPLES = 8
+
+
+class Output(NamedTuple):
+    """How a card is encoded and returned
+
+    Parameters
+    ----------
+    format: :class:`str`
+        `PNG` `WEBP` `JPEG` or the animated `GIF` and `APNG`. Default is `PNG`
+
+    compress_level: Optional[:class:`int`]
+        zlib level of `PNG` from `0` (fastest, biggest) to `9` (slowest, smallest). Default is `None` which is Pillow's default (`6`)
+
+    optimize: :class:`bool`
+        Whether to spend extra CPU on a smaller `PNG` or `JPEG`. Default is `False`
+
+    quality: Optional[:class:`int`]
+        Quality of `WEBP` and `JPEG` from `1` to `100`. Default is `None` which is Pillow's default
+
+    lossless: :class:`bool`
+        Whether to encode `WEBP` losslessly. Default is `False`
+
+    method: Optional[:class:`int`]
+        Effort of the `WEBP` encoder from `0` (fast) to `6` (small). Default is `None` which is Pillow's default (`4`)
+
+    as_bytes: :class:`bool`
+        Whether to return `bytes` instead of a rewound `BytesIO`. Default is `False`
+
+    colors: Optional[:class:`int`]
+        The size of the palette shared by every frame of a `GIF` or `APNG`, `None` keeps a full colour `APNG`. Default is `None`
+
+    max_frames: :class:`int`
+        The most frames of an animated avatar kept, frames are merged evenly above it. `0` keeps every frame. Default is `0`
+
+    max_duration: :class:`int`
+        Milliseconds of an animated avatar kept, the rest is cut. `0` keeps the whole animation. Default is `0`
+
+    Methods
+    -------
+    - `png`
+    - `fast_png`
+    - `optimized_png`
+    - `webp`
+    - `jpeg`
+    - `gif`
+    - `apng`
+    - `encode`
+        encodes an image
+    - `encode_frames`
+        encodes the frames of an animation
+    """
+
+    format: str = "PNG"
+    compress_level: Optional[int] = None
+    optimize: bool = False
+    quality: Optional[int] = None
+    lossless: bool = False
+    method: Optional[int] = None
+    as_bytes: bool = False
+    colors: Optional[int] = None
+    max_frames: int = 0
+    max_duration: int = 0
+
+    @classmethod
+    def png(cls, compress_level: Optional[int] = None, as_bytes: bool = False) -> "Output":
+        """PNG with the given `compress_level`"""
+        return cls("PNG", compress_level=compress_level, as_bytes=as_bytes)
+
+    @classmethod
+    def fast_png(cls, as_bytes: bool = False) -> "Output":
+        """PNG that is fast to encode but bigger"""
+        return cls("PNG", compress_level=1, as_bytes=as_bytes)
+
+    @classmethod
+    def optimized_png(cls, as_bytes: bool = False) -> "Output":
+        """the smallest PNG, slow to encode"""
+        return cls("PNG", compress_level=9, optimize=True, as_bytes=as_bytes)
+
+    @classmethod
+    def webp(cls, quality: int = 80, lossless: bool = False, method: Optional[int] = None, as_bytes: bool = False) -> "Output":
+        """lossy or lossless WebP"""
+        return cls("WEBP", quality=quality, lossless=lossless, method=method, as_bytes=as_bytes)
+
+    @classmethod
+    def jpeg(cls, quality: int = 85, optimize: bool = False, as_bytes: bool = False) -> "Output":
+        """JPEG, transparency is dropped"""
+        return cls("JPEG", quality=quality, optimize=optimize, as_bytes=as_bytes)
+
+    @classmethod
+    def gif(cls, colors: int = 256, max_frames: int = 50, max_duration: int = 10000, as_bytes: bool = False) -> "Output":
+        """animated GIF when the avatar is animated, every frame shares one palette of `colors`"""
+        return cls("GIF", colors=colors, max_frames=max_frames, max_duration=max_duration, as_bytes=as_bytes)
+
+    @classmethod
+    def apng(cls, colors: Optional[int] = 256, max_frames: int = 50, max_duration: int = 10000, as_bytes: bool = False) -> "Output":
+        """animated PNG when the avatar is animated, `colors=None` keeps full colour"""
+        return cls("APNG", colors=colors, max_frames=max_frames, max_duration=max_duration, as_bytes=as_bytes)
+
+    @property
+    def extension(self) -> str:
+        """The file extension of the format, eg `png`"""
+        if self.format == "APNG":
+            return "png"
+        return "jpg" if self.format == "JPEG" else self.format.lower()
+
+    @property
+    def animated(self) -> bool:
+        """Whether the format can hold an animated avatar"""
+        return self.format in ANIMATED_FORMATS
+
+    def _buffer(self, buffer: BytesIO) -> Union[BytesIO, bytes]:
+        if self.as_bytes:
+            return buffer.getvalue()
+        buffer.seek(0)
+        return buffer
+
+    def _palette(self, frames: Sequence[Image.Image], colors: int) -> Image.Image:
+        step = max(1, len(frames) // PALETTE_SAMPLES)
+        samples = [frame.convert("RGB") for frame in frames[::step][:PALETTE_SAMPLES]]
+        strip = Image.new("RGB", (samples[0].width, samples[0].height * len(samples)))
+        for index, sample in enumerate(samples):
+            strip.paste(sample, (0, sample.height * index))
+        return strip.quantize(colors, Image.Quantize.MEDIANCUT)
+
+    def _quantize(self, frames: Sequence[Image.Image]) -> Tuple[List[Image.Image], Optional[int]]:
+        transparent = any(frame.mode == "RGBA" and frame.getchannel("A").getextrema()[0] < 128 for frame in frames)
+        colors = max(2, min(self.colors or 256, 256))
+        palette = self._palette(frames, colors - 1 if transparent else colors)
+        index = len(palette.getpalette()) // 3 if transparent else None
+        quantized = []
+        for frame in frames:
+            image = frame.convert("RGB").quantize(palette=palette, dither=Image.Dither.NONE)
+            if index is not None:
+                image.paste(index, mask=frame.getchannel("A").point(lambda alpha: 255 if alpha < 128 else 0))
+            quantized.append(image)
+        return quantized, index
+
+    def encode_frames(self, frames: Sequence[Image.Image], durations: Sequence[int]) -> Union[BytesIO, bytes]:
+        """encodes `frames` shown for `durations` milliseconds each as a looping `GIF` or `APNG`
+
+        A single frame is encoded as a still image.
+        """
+        if self.format not in ANIMATED_FORMATS:
+            raise ValueError(f"format must be one of {', '.join(ANIMATED_FORMATS)} to encode frames, not {self.format!r}")
+
+        buffer = BytesIO()
+        params = {}
+        if self.format == "GIF" or self.colors:
+            frames, index = self._quantize(frames)
+            if index is not None:
+                params["transparency"] = index
+        if len(frames) > 1:
+            params.update(save_all=True, append_images=list(frames[1:]), duration=list(durations), loop=0)
+        if self.format == "GIF":
+            frames[0].save(buffer, "GIF", **params)
+        else:
+            if self.compress_level is not None:
+                params["compress_level"] = self.compress_level
+            frames[0].save(buffer, "PNG", **params)
+        return self._buffer(buffer)
+
+    def encode(self, image: Image.Image) -> Union[BytesIO, bytes]:
+        """encodes `image` and returns a rewound `BytesIO` or `bytes`"""
+        if self.format not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}, not {self.format!r}")
+        if self.format in ANIMATED_FORMATS:
+            return self.encode_frames([image], [0])
+
+        params = {}
+        if self.format == "PNG":
+            if self.compress_level is not None:
+                params["compress_level"] = self.compress_level
+            params["optimize"] = self.optimize
+        elif self.format == "WEBP":
+            params["lossless"] = self.lossless
+            if self.quality is not None:
+                params["quality"] = self.quality
+            if self.method is not None:
+                params["method"] = self.method
+        else:
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+            if self.quality is not None:
+                params["quality"] = self.quality
+            params["optimize"] = self.optimize
+
+        buffer = BytesIO()
+        image.save(buffer, self.format, **params)
+        return self._buffer(buffer)
+
+
+_default = Output()
+
+
+def get_default_output() -> Output:
+    """returns the :class:`Output` used by cards rendered without `output`"""
+    return _default
+
+
+def set_default_output(output: Optional[Output]) -> None:
+    """sets the :class:`Output` used by cards rendered without `output`, `None` brings back `PNG`"""
+    global _default
+    _default = output if output is not None else Output()
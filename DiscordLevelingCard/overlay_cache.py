@@ -0,0 +1,135 @@
+import os
+from collections import OrderedDict
+from contextlib import suppress
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from typing import Optional, Tuple, Union
+
+from PIL import Image, ImageChops, ImageColor
+
+from .asset_registry import registry
+
+CACHE_DIR_ENV = "DISCORDLEVELINGCARD_CACHE_DIR"
+
+
+def recolour(overlay: Image.Image, colour: Tuple[int, int, int, int]) -> Image.Image:
+    """returns a copy of `overlay` with every opaque black pixel replaced by `colour`"""
+    overlay = overlay.convert("RGBA")
+    mask = None
+    for band, value in zip(overlay.split(), (0, 0, 0, 255)):
+        band = band.point(lambda x, value=value: 255 if x == value else 0)
+        mask = band if mask is None else ImageChops.multiply(mask, band)
+    overlay.paste(colour, mask=mask)
+    return overlay
+
+
+class OverlayCache:
+    """Cache of the recoloured `overlay1.png` used by :meth:`Sandbox.custom_card1`
+
+    Recoloured overlays are kept in a least recently used cache in memory and,
+    when `cache_dir` is set, written to that directory so other processes and
+    restarts can reuse them. Files are written atomically, a directory that can
+    not be written to is ignored.
+
+    Parameters
+    ----------
+    maxsize: :class:`int`
+        The maximum number of overlays kept in memory. Default is `32`
+
+    cache_dir: Optional[:class:`Union[str, PathLike]`]
+        The directory the overlays are persisted in. Default is the
+        `DISCORDLEVELINGCARD_CACHE_DIR` environment variable or `None` to keep them in memory only
+
+    Attributes
+    ----------
+    - `maxsize`
+    - `cache_dir`
+
+    Methods
+    -------
+    - `get`
+        returns the overlay in the given colour
+    - `clear`
+        drops every overlay kept in memory
+    """
+
+    __slots__ = ('maxsize', 'cache_dir', '_lock', '_overlays')
+
+    def __init__(self, maxsize: int = 32, cache_dir: Optional[Union[str, "os.PathLike"]] = None) -> None:
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir if cache_dir is not None else os.environ.get(CACHE_DIR_ENV)
+        self._lock = Lock()
+        self._overlays: "OrderedDict[Tuple[int, int, int, int], Image.Image]" = OrderedDict()
+
+    def _path(self, colour: Tuple[int, int, int, int]) -> Optional[Path]:
+        if not self.cache_dir:
+            return None
+        return Path(self.cache_dir) / ("%02x%02x%02x%02x_overlay1.png" % colour)
+
+    def _load(self, colour: Tuple[int, int, int, int], persist: bool) -> Image.Image:
+        path = self._path(colour)
+        if path is not None and path.is_file():
+            try:
+                overlay = Image.open(path)
+                overlay.load()
+                return overlay
+            except OSError:
+                pass
+
+        overlay = recolour(registry.image("overlay1.png"), colour)
+        if persist and path is not None:
+            OverlayCache._persist(overlay, path)
+        return overlay
+
+    @staticmethod
+    def _persist(overlay: Image.Image, path: Path) -> None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            file = NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False)
+        except OSError:
+            return
+        try:
+            with file:
+                overlay.save(file, "PNG")
+            os.replace(file.name, path)
+        except OSError:
+            with suppress(OSError):
+                os.unlink(file.name)
+
+    def get(self, card_colour: str, persist: bool = True) -> Image.Image:
+        """returns `overlay1.png` recoloured to `card_colour`
+
+        Parameters
+        ----------
+        card_colour: :class:`str`
+            A colour name or hex code
+
+        persist: :class:`bool`
+            Whether to write a newly recoloured overlay to `cache_dir`. Default is `True`
+        """
+        colour = ImageColor.getcolor(card_colour, "RGBA")
+        if colour == (0, 0, 0, 255):
+            return registry.image("overlay1.png")
+
+        with self._lock:
+            overlay = self._overlays.get(colour)
+            if overlay is not None:
+                self._overlays.move_to_end(colour)
+                return overlay
+
+        overlay = self._load(colour, persist)
+        with self._lock:
+            overlay = self._overlays.setdefault(colour, overlay)
+            self._overlays.move_to_end(colour)
+            while len(self._overlays) > self.maxsize:
+                self._overlays.popitem(last=False)
+        return overlay
+
+    def clear(self) -> None:
+        """drops every overlay kept in memory, the files in `cache_dir` are kept"""
+        with self._lock:
+            self._overlays.clear()
+
+
+overlay_cache = OverlayCache()
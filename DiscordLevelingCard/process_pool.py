@@ -0,0 +1,223 @@
+import asyncio
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from io import BytesIO
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+from .asset_registry import registry
+from .avatar_cache import prepare_avatar
+from .card_settings import Settings
+from .error import DiscordLevelingCardError
+from .font_cache import fonts, DEFAULT_FONT
+from .image_loader import open_image
+from .animated import is_animated, render_animated
+
+# assets and font sizes used by the bundled designs, loaded by every worker on start up
+WARM_ASSETS = ("overlay1.png", "curvedoverlay.png", "mask_circle.jpg", "curveborder.png", "mask_hexagon.png")
+WARM_MASKS = (("mask_circle.jpg", (170, 170)), ("curveborder.png", (260, 260)))
+WARM_FONT_SIZES = (30, 40, 50)
+
+
+class RenderJob(NamedTuple):
+    """Picklable description of a single card render
+
+    Parameters
+    ----------
+    design: :class:`str`
+        The card method to render, `card1` `card2` `card3` `custom_card1` or `custom_canvas`
+
+    settings: :class:`str`
+        The name the :class:`Settings` were registered with in the :class:`ProcessRenderer`
+
+    avatar: :class:`bytes`
+        The encoded avatar image
+
+    username: :class:`str`
+        The username of the member
+
+    level: :class:`int`
+        The level of the member
+
+    current_exp: :class:`int`
+        The current amount of XP the member has
+
+    max_exp: :class:`int`
+        The amount of XP required for the member to level up
+
+    rank: Optional[:class:`int`]
+        The rank of the member. Default is `None`
+
+    cacheing: :class:`bool`
+        The `cacheing` flag of :class:`Sandbox`. Default is `False`
+
+    options: :class:`dict`
+        The keyword arguments of the card method, eg `{"resize": 100}`
+    """
+
+    design: str
+    settings: str
+    avatar: bytes
+    username: str
+    level: int
+    current_exp: int
+    max_exp: int
+    rank: Optional[int] = None
+    cacheing: bool = False
+    options: Dict[str, Any] = {}
+
+
+RANK_CARD_DESIGNS = ("card1", "card2", "card3")
+SANDBOX_DESIGNS = ("custom_card1", "custom_canvas")
+
+_settings: Dict[str, Settings] = {}
+
+
+def _settings_spec(settings: Settings) -> Tuple[bytes, Any, Any, Any]:
+    image = BytesIO()
+    settings.background.save(image, "PNG", compress_level=1)
+    return (image.getvalue(), settings.background_color, settings.bar_color, settings.text_color)
+
+
+def encode_avatar(avatar: Image.Image) -> bytes:
+    """encodes `avatar` as a fast, losslessly compressed PNG (APNG when it is animated) so it can be sent to a worker"""
+    image = BytesIO()
+    avatar.save(image, "PNG", compress_level=1, save_all=is_animated(avatar))
+    return image.getvalue()
+
+
+def _init_worker(specs: Dict[str, Tuple[bytes, Any, Any, Any]]) -> None:
+    for name, (background, background_color, bar_color, text_color) in specs.items():
+        _settings[name] = Settings(
+            background=Image.open(BytesIO(background)),
+            background_color=background_color,
+            bar_color=bar_color,
+            text_color=text_color
+        )
+    for name in WARM_ASSETS:
+        registry.image(name)
+        registry.luminance(name)
+    for name, size in WARM_MASKS:
+        registry.mask(name, size)
+    for size in WARM_FONT_SIZES:
+        fonts.get(DEFAULT_FONT, size)
+
+
+def _ping() -> bool:
+    return True
+
+
+def _render_job(job: RenderJob) -> bytes:
+    from .discord_card import RankCard
+    from .sandbox import Sandbox
+
+    if job.settings not in _settings:
+        raise DiscordLevelingCardError(f"No settings registered as {job.settings!r}")
+    if job.design in RANK_CARD_DESIGNS:
+        card_class = RankCard
+        extra = {}
+    elif job.design in SANDBOX_DESIGNS:
+        card_class = Sandbox
+        extra = {"cacheing": job.cacheing}
+    else:
+        raise DiscordLevelingCardError(f"Unknown design {job.design!r}")
+    size, frame = card_class._avatar_frame(job.design, job.options)
+    avatar = open_image(job.avatar, (size, size), "avatar")
+    card = card_class(
+        settings=_settings[job.settings], avatar=avatar, level=job.level, username=job.username,
+        current_exp=job.current_exp, max_exp=job.max_exp, rank=job.rank, **extra
+    )
+    if job.options["output"].animated and is_animated(avatar):
+        result = render_animated(card, job.design, avatar, job.options)
+        return result if isinstance(result, bytes) else result.getvalue()
+    avatar = prepare_avatar(avatar, size, frame)
+    result = getattr(card, "_" + job.design)(avatar, **job.options)
+    return result if isinstance(result, bytes) else result.getvalue()
+
+
+class ProcessRenderer:
+    """Render backend running the cards in a pool of pre-warmed worker processes
+
+    Pass it as the `executor` of :class:`RankCard` or :class:`Sandbox` to render
+    outside of the current process. Every worker decodes the settings, the bundled
+    assets and the fonts once on start up, a render then only sends a small
+    :class:`RenderJob` to the worker and receives the encoded card back.
+
+    Parameters
+    ----------
+    settings: :class:`Dict[str, Settings]`
+        The settings the workers can render with, by name. Cards can only use these settings
+
+    max_workers: Optional[:class:`int`]
+        The number of worker processes. Default is `None` which is the number of CPUs
+
+    mp_context: Optional[:class:`multiprocessing.context.BaseContext`]
+        The multiprocessing context used to start the workers. Default is `None`
+
+    Attributes
+    ----------
+    - `settings`
+    - `max_workers`
+
+    Methods
+    -------
+    - `start`
+        starts every worker process
+    - `name_of`
+        returns the name the given settings were registered with
+    - `render`
+        renders a :class:`RenderJob` and returns the encoded card
+    - `submit`
+        submits a :class:`RenderJob` and returns a :class:`concurrent.futures.Future`
+    - `shutdown`
+        stops the worker processes
+    """
+
+    __slots__ = ('settings', 'max_workers', '_pool')
+
+    def __init__(
+        self,
+        settings: Dict[str, Settings],
+        max_workers: Optional[int] = None,
+        mp_context: Optional[Any] = None
+    ) -> None:
+        self.settings = dict(settings)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        specs = {name: _settings_spec(value) for name, value in self.settings.items()}
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=mp_context,
+            initializer=_init_worker,
+            initargs=(specs,)
+        )
+
+    def __enter__(self) -> "ProcessRenderer":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.shutdown()
+
+    def name_of(self, settings: Settings) -> str:
+        """returns the name `settings` were registered with"""
+        for name, value in self.settings.items():
+            if value is settings:
+                return name
+        raise DiscordLevelingCardError("Settings must be registered in the ProcessRenderer to render in it")
+
+    async def start(self) -> None:
+        """starts and warms up every worker process"""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._pool, _ping) for _ in range(self.max_workers)))
+
+    def submit(self, job: RenderJob) -> Future:
+        """submits `job` to the workers"""
+        return self._pool.submit(_render_job, job)
+
+    async def render(self, job: RenderJob) -> bytes:
+        """renders `job` in a worker and returns the encoded card"""
+        return await asyncio.wrap_future(self.submit(job))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """stops the worker processes"""
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,235 @@
+import os
+import sqlite3
+import time
+from contextlib import suppress
+from functools import lru_cache
+from hashlib import blake2b
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple, Union
+from weakref import WeakKeyDictionary
+
+from PIL import Image
+
+from .animated import is_animated
+from .card_settings import Settings
+from .discord_cdn import get_cdn_sizing
+
+RENDER_CACHE_DIR_ENV = "DISCORDLEVELINGCARD_RENDER_CACHE_DIR"
+# part of every key, bump it when a change to the designs changes their output
+RENDER_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS renders (key TEXT PRIMARY KEY, size INTEGER NOT NULL, used REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS renders_used ON renders (used);
+"""
+
+
+@lru_cache(maxsize=None)
+def _library_version() -> str:
+    try:
+        from importlib.metadata import version
+        return version("discordlevelingcard")
+    except Exception:
+        return "unknown"
+
+
+class RenderCache:
+    """Persistent cache of encoded cards on disk
+
+    A card is looked up by a hash of everything it is drawn from: the design
+    and its options, the settings and the pixels of their background, the
+    avatar (its url, or the pixels of an opened image), the username and the
+    numbers. A card requested again with the same inputs, also after a
+    restart, is read from disk instead of being rendered.
+
+    The cards are stored as files in `directory` with a small sqlite index of
+    their sizes and last use, the least recently used cards are deleted when
+    the directory grows over `max_bytes`. Several processes can share the
+    directory. The cache is disabled while `directory` is `None`.
+
+    Parameters
+    ----------
+    directory: Optional[:class:`Union[str, PathLike]`]
+        The directory the cards are stored in. Default is the
+        `DISCORDLEVELINGCARD_RENDER_CACHE_DIR` environment variable or `None` which disables the cache
+
+    max_bytes: :class:`int`
+        The size budget of the stored cards in bytes. Default is `256 MiB`
+
+    Attributes
+    ----------
+    - `directory`
+    - `max_bytes`
+    - `hits`
+    - `misses`
+
+    Methods
+    -------
+    - `key`
+        returns the key of a card
+    - `lookup`
+        returns the key and the stored card of a card
+    - `get`
+        returns a stored card
+    - `put`
+        stores a card
+    - `stats`
+        returns the counters as a `dict`
+    - `clear`
+        deletes every stored card
+    """
+
+    __slots__ = ('directory', 'max_bytes', 'hits', 'misses', '_lock', '_db', '_db_directory', '_backgrounds')
+
+    def __init__(self, directory: Optional[Union[str, "os.PathLike"]] = None, max_bytes: int = 256 * 1024 * 1024) -> None:
+        self.directory = directory if directory is not None else os.environ.get(RENDER_CACHE_DIR_ENV)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_directory: Optional[Path] = None
+        self._backgrounds: "WeakKeyDictionary[Settings, Tuple[Image.Image, str]]" = WeakKeyDictionary()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether `directory` is set"""
+        return bool(self.directory)
+
+    def _connection(self) -> Tuple[sqlite3.Connection, Path]:
+        # called with the lock held, reopens the index when `directory` was changed
+        directory = Path(self.directory)
+        if self._db is None or self._db_directory != directory:
+            if self._db is not None:
+                self._db.close()
+            directory.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(directory / "index.sqlite3", timeout=10, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+            self._db_directory = directory
+        return self._db, directory
+
+    @staticmethod
+    def _path(directory: Path, key: str) -> Path:
+        return directory / key[:2] / key
+
+    @staticmethod
+    def _digest(image: Image.Image) -> str:
+        return blake2b(f"{image.mode}{image.size}".encode() + image.tobytes(), digest_size=16).hexdigest()
+
+    def _background(self, settings: Settings) -> str:
+        background = settings.background
+        with self._lock:
+            cached = self._backgrounds.get(settings)
+        if cached is not None and cached[0] is background:
+            return cached[1]
+        digest = RenderCache._digest(background)
+        with self._lock:
+            self._backgrounds[settings] = (background, digest)
+        return digest
+
+    def key(self, card: Any, design: str, options: Dict[str, Any]) -> Optional[str]:
+        """returns the key of `card` rendered as `design` with `options`, `None` when the card can not be cached"""
+        avatar = card.avatar
+        if isinstance(avatar, str):
+            avatar = ("url", avatar, get_cdn_sizing())
+        elif isinstance(avatar, Image.Image) and not is_animated(avatar):
+            avatar = ("image", RenderCache._digest(avatar))
+        else:
+            return None
+
+        settings = card.settings
+        parts = (
+            RENDER_VERSION, _library_version(), type(card).__name__, design, sorted(options.items()),
+            settings.background_color, settings.background_size, self._background(settings),
+            avatar, card.username, card.level, card.rank, card.current_exp, card.max_exp, card.text_color, card.bar_color
+        )
+        return blake2b(repr(parts).encode(), digest_size=20).hexdigest()
+
+    def lookup(self, card: Any, design: str, options: Dict[str, Any]) -> Tuple[Optional[str], Optional[bytes]]:
+        """returns the key of the card and its stored encoded card, or `None` for either"""
+        key = self.key(card, design, options)
+        return key, None if key is None else self.get(key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """returns the stored card of `key`, `None` when it is not stored"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            db, directory = self._connection()
+        try:
+            data = RenderCache._path(directory, key).read_bytes()
+        except OSError:
+            data = None
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                db.execute("DELETE FROM renders WHERE key = ?", (key,))
+                return None
+            self.hits += 1
+            db.execute("UPDATE renders SET used = ? WHERE key = ?", (time.time(), key))
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """stores the encoded card `data` as `key`, evicting the least recently used cards over `max_bytes`"""
+        if not self.enabled or len(data) > self.max_bytes:
+            return
+        with self._lock:
+            db, directory = self._connection()
+        path = RenderCache._path(directory, key)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            file = NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False)
+        except OSError:
+            return
+        try:
+            with file:
+                file.write(data)
+            os.replace(file.name, path)
+        except OSError:
+            with suppress(OSError):
+                os.unlink(file.name)
+            return
+
+        with self._lock:
+            db.execute("INSERT OR REPLACE INTO renders (key, size, used) VALUES (?, ?, ?)", (key, len(data), time.time()))
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM renders").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            evicted = []
+            for old, size in db.execute("SELECT key, size FROM renders ORDER BY used"):
+                if total <= self.max_bytes:
+                    break
+                evicted.append(old)
+                total -= size
+            db.executemany("DELETE FROM renders WHERE key = ?", [(old,) for old in evicted])
+        for old in evicted:
+            with suppress(OSError):
+                os.unlink(RenderCache._path(directory, old))
+
+    def stats(self) -> Dict[str, int]:
+        """returns the cache counters"""
+        entries = size = 0
+        with self._lock:
+            if self.enabled:
+                db, _ = self._connection()
+                entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM renders").fetchone()
+            return {"entries": entries, "size": size, "hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        """deletes every stored card, the counters are kept"""
+        if not self.enabled:
+            return
+        with self._lock:
+            db, directory = self._connection()
+            keys = [key for key, in db.execute("SELECT key FROM renders")]
+            db.execute("DELETE FROM renders")
+        for key in keys:
+            with suppress(OSError):
+                os.unlink(RenderCache._path(directory, key))
+
+
+render_cache = RenderCache()
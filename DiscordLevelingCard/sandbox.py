@@ -1,11 +1,35 @@
 from io import BytesIO
-from typing import Optional, Union, List
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Iterable, Optional, Tuple, Union, List
 
-from aiohttp import ClientSession
-from PIL import Image, ImageDraw, ImageFont, ImageColor
-from .error import InvalidImageUrl
-from pathlib import Path
+from PIL import Image, ImageDraw, ImageColor
 from .card_settings import Settings
+from .asset_registry import registry
+from .font_cache import fonts, DEFAULT_FONT
+from .executor import run_in_executor
+from .http_session import fetch
+from .avatar_cache import MaskedAvatar, avatar_cache, prepare_avatar
+from .layer_cache import base_layers
+from .layout import Scale
+from .member_cache import member_cache
+from .text_cache import text_cache
+from .bar_cache import bar_cache
+from .canvas_layout import CanvasLayout
+from . import batch
+from .output import Output, get_default_output
+from .overlay_cache import overlay_cache
+from .process_pool import ProcessRenderer, RenderJob, encode_avatar
+from .timings import RenderTimings, stage, timed
+from .image_loader import image_limits, open_image
+from .discord_cdn import avatar_url
+from .error import InvalidImageUrl
+from .animated import is_animated, render_animated
+from .render_cache import render_cache
+from .single_flight import renders
+from .scheduler import RenderScheduler
+
+# custom_card1 is drawn at the 638x327 size of its overlay and saved at 505x259
+CARD1_NATIVE = 505 / 638
 
 class Sandbox:
     """class to create your own cards
@@ -16,7 +40,7 @@ class Sandbox:
         The settings for the rank card
 
     cacheing: :class:`bool`
-        Whether to cache the image or not. Default is `True`
+        Whether to persist recoloured `custom_card1` overlays in `overlay_cache.cache_dir` or not. Default is `True`
 
     avatar: :class:`Union[PathLike, BufferedIOBase]`
         The avatar image for the rank card. This can be a path to a file or a file-like object in `rb` mode
@@ -36,6 +60,19 @@ class Sandbox:
     rank: Optional[:class:`int`]
         The rank of the member. Default is `None`
 
+    executor: Optional[:class:`Union[Executor, ProcessRenderer]`]
+        The executor the card is rendered in, so the event loop is only used to fetch the avatar.
+        A :class:`ProcessRenderer` renders the card in its worker processes instead.
+        Default is `None` which uses the executor shared by every card (see `set_executor`)
+
+    timings_hook: Optional[:class:`Callable[[RenderTimings], None]`]
+        Called after every render with the :class:`RenderTimings` of its stages (download, decode, resize, drawing, encode) and byte sizes.
+        Default is `None`
+
+    scheduler: Optional[:class:`RenderScheduler`]
+        Bounds the renders running and waiting at once, a render is rejected when its queue is full
+        and dropped when it waited past its deadline. Default is `None` which renders right away
+
     Attributes
     ----------
     - `settings`
@@ -46,6 +83,9 @@ class Sandbox:
     - `current_exp`
     - `max_exp`
     - `rank`
+    - `executor`
+    - `timings_hook`
+    - `scheduler`
 
     Methods
     -------
@@ -60,10 +100,16 @@ class Sandbox:
         If the image type is not supported
     - `InvalidImageUrl`
         If the image url is invalid
+    - `RenderQueueFull`
+        If the queue of the `scheduler` is full
+    - `RenderDeadlineExceeded`
+        If the render waited for the `scheduler` past its deadline
 
     """
 
-    __slots__ = ('background', 'cacheing', 'rank', 'background_color', 'text_color', 'bar_color', 'settings', 'avatar', 'level', 'username', 'current_exp', 'max_exp')
+    __slots__ = ('cacheing', 'rank', 'background_color', 'text_color', 'bar_color', 'settings', 'avatar', 'level', 'username', 'current_exp', 'max_exp', 'executor', 'timings_hook', 'scheduler')
+
+    _designs = ("custom_card1", "custom_canvas")
 
     def __init__(
         self,
@@ -74,10 +120,12 @@ class Sandbox:
         current_exp:int,
         max_exp:int,
         cacheing:bool = True,
-        rank:Optional[int] = None
-
+        rank:Optional[int] = None,
+        executor:Optional[Union[Executor, ProcessRenderer]] = None,
+        timings_hook:Optional[Callable[[RenderTimings], None]] = None,
+        scheduler:Optional[RenderScheduler] = None
     ):
-        self.background = settings.background
+        self.settings = settings
         self.background_color = settings.background_color
         self.avatar = avatar
         self.level = level
@@ -88,6 +136,13 @@ class Sandbox:
         self.bar_color = settings.bar_color
         self.text_color = settings.text_color
         self.cacheing = cacheing
+        self.executor = executor
+        self.timings_hook = timings_hook
+        self.scheduler = scheduler
+
+    @property
+    def background(self) -> Image.Image:
+        return self.settings.background
 
     @staticmethod
     def _convert_number(number: int) -> str:
@@ -101,19 +156,251 @@ class Sandbox:
             return str(number)
 
     @staticmethod
-    async def _image(url:str):
-        async with ClientSession()   as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    raise InvalidImageUrl(f"Invalid image url: {url}")
-                data = await response.read()
-                return Image.open(BytesIO(data))
+    async def _fetch(url:str) -> bytes:
+        return await fetch(url, image_limits.max_bytes)
+
+    @staticmethod
+    async def _fetch_avatar(url: str, size: int) -> bytes:
+        sized = avatar_url(url, size)
+        try:
+            return await Sandbox._fetch(sized)
+        except InvalidImageUrl:
+            if sized == url:
+                raise
+            # the CDN refused the size, the avatar as it was given
+            return await Sandbox._fetch(url)
+
+    @staticmethod
+    async def _image(url:str, size: Optional[int] = None):
+        if size is None:
+            return open_image(await Sandbox._fetch(url), name="avatar")
+        return open_image(await Sandbox._fetch_avatar(url, size), (size, size), "avatar")
+
+    async def _avatar(self, size: int, frame: str, timings: Optional[RenderTimings] = None) -> MaskedAvatar:
+        if isinstance(self.avatar, str) and self.avatar.startswith("http"):
+            avatar = avatar_cache.get(self.avatar, size, frame)
+            if avatar is None:
+                if timings is None:
+                    image = await Sandbox._image(self.avatar, size)
+                else:
+                    with timings.stage("avatar_fetch"):
+                        data = await Sandbox._fetch_avatar(self.avatar, size)
+                    timings.sizes["avatar"] = len(data)
+                    image = open_image(data, (size, size), "avatar")
+                avatar = await self._run(timings, prepare_avatar, image, size, frame)
+                avatar_cache.put(self.avatar, size, frame, avatar)
+            return avatar
+        elif isinstance(self.avatar, Image.Image):
+            return await self._run(timings, prepare_avatar, self.avatar, size, frame)
+        raise TypeError(f"avatar must be a url, not {type(self.avatar)}")
+
+    async def _animated_avatar(self, size: int, frame: str, timings: Optional[RenderTimings] = None) -> Optional[Image.Image]:
+        # the avatar when it is animated, a still url avatar is prepared into the avatar cache instead of being downloaded twice
+        if isinstance(self.avatar, Image.Image):
+            return self.avatar if is_animated(self.avatar) else None
+        if not (isinstance(self.avatar, str) and self.avatar.startswith("http")):
+            raise TypeError(f"avatar must be a url, not {type(self.avatar)}")
+        if avatar_cache.get(self.avatar, size, frame) is not None:
+            return None
+        data = avatar_cache.get_animated(self.avatar, size)
+        if data is None:
+            with timed(timings, "avatar_fetch"):
+                data = await Sandbox._fetch_avatar(self.avatar, size)
+            if timings is not None:
+                timings.sizes["avatar"] = len(data)
+        image = open_image(data, (size, size), "avatar")
+        if is_animated(image):
+            # kept encoded, every render decodes its own frames
+            avatar_cache.put_animated(self.avatar, size, data)
+            return image
+        avatar_cache.put(self.avatar, size, frame, await self._run(timings, prepare_avatar, image, size, frame))
+        return None
+
+    async def _run(self, timings: Optional[RenderTimings], func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        if timings is None:
+            return await run_in_executor(self.executor, func, *args, **kwargs)
+        return await run_in_executor(self.executor, timings.run(func, *args, **kwargs))
+
+    @staticmethod
+    def _avatar_frame(design: str, options: dict) -> Tuple[int, str]:
+        if design == "custom_card1":
+            return Scale.of(options["resize"], options["direct"], CARD1_NATIVE).size(170), "circle"
+        return options["layout"].compiled().avatar_size, options["layout"].avatar_frame
+
+    @staticmethod
+    def _avatar_box(design: str, options: dict) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        """returns where the avatar is pasted and the size of the canvas it is pasted on"""
+        if design == "custom_card1":
+            scale = Scale.of(options["resize"], options["direct"], CARD1_NATIVE)
+            return scale.xy((13, 65)), scale.canvas((638, 327), (505, 259))
+        compiled = options["layout"].compiled()
+        return compiled.avatar_position, compiled.canvas_size
+
+    @staticmethod
+    def _options(design: str, options: dict) -> dict:
+        if design != "custom_canvas":
+            return options
+        layout = options.pop("layout", None)
+        output = options.pop("output", None)
+        if layout is None:
+            layout = CanvasLayout(**options)
+        return {"layout": layout, "output": output}
+
+    def _numbers(self, resize: int, direct: bool, output: Optional[Output]) -> tuple:
+        # a card rendered full size is shared by every `resize`, only its last encoded card depends on it
+        return (self.level, self.rank, self.current_exp, self.max_exp, self.bar_color, resize, direct, output)
+
+    @classmethod
+    def render_many(
+        cls,
+        settings: Settings,
+        members: Iterable[Dict[str, Any]],
+        design: str = "custom_card1",
+        concurrency: int = 8,
+        executor: Optional[Union[Executor, ProcessRenderer]] = None,
+        return_exceptions: bool = False,
+        **options: Any
+    ) -> AsyncIterator[Tuple[Dict[str, Any], Union[BytesIO, BaseException]]]:
+        """
+        Renders the same design for many members and yields `(member, image)` as soon as each card is done
+
+        Fonts, the base layer and the avatars of members sharing an avatar url are shared by the whole batch,
+        every card is rendered like its card method (render cache, scheduler, timings hook, animated `output`)
+
+        Parameters
+        ----------
+        settings: :class:`Settings`
+            The settings for every card
+
+        members: :class:`Iterable[dict]`
+            The keyword arguments of every card, eg `{"avatar": url, "level": 1, "username": "name", "current_exp": 1, "max_exp": 10}`.
+            `rank` `cacheing` is optional
+
+        design: :class:`str`
+            The card method to render, one of `custom_card1`, `custom_canvas`. Default is `custom_card1`
+
+        concurrency: :class:`int`
+            The maximum number of cards rendered (and avatars downloaded) at once. Default is `8`
+
+        executor: Optional[:class:`Union[Executor, ProcessRenderer]`]
+            The executor the cards are rendered in. Default is `None`
+
+        return_exceptions: :class:`bool`
+            Whether a failed card is yielded as `(member, exception)` instead of raising. Default is `False`
+
+        options:
+            The keyword arguments of the card method, eg `resize=50`
+
+        Returns
+        -------
+        an async iterator of `(member, image)` in completion order
+
+        ```py
+        async for member, image in Sandbox.render_many(settings, members, design="custom_card1"):
+            ...
+        ```
+        """
+        return batch.render_many(cls, settings, members, design, concurrency, executor, return_exceptions, **options)
+
+    async def _render(self, design: str, **options) -> Union[BytesIO, bytes]:
+        if self.timings_hook is None:
+            return await self._render_timed(design, None, **options)
+        timings = RenderTimings(design)
+        try:
+            result = await self._render_timed(design, timings, **options)
+        except BaseException as error:
+            self.timings_hook(timings.finish(error))
+            raise
+        timings.sizes["output"] = len(result) if isinstance(result, bytes) else len(result.getbuffer())
+        self.timings_hook(timings.finish())
+        return result
+
+    async def _render_timed(self, design: str, timings: Optional[RenderTimings], **options) -> Union[BytesIO, bytes]:
+        options["output"] = options.get("output") or get_default_output()
+        # identical cards rendered at the same time are rendered once, every caller gets its own `BytesIO`
+        with timed(timings, "single_flight"):
+            data = await renders.run(self._flight_key(design, options), lambda: self._render_cached(design, timings, options))
+        return data if options["output"].as_bytes else BytesIO(data)
+
+    def _flight_key(self, design: str, options: dict) -> Hashable:
+        avatar = self.avatar if isinstance(self.avatar, str) else id(self.avatar)
+        return (
+            type(self).__name__, design, tuple(sorted(options.items())), self.settings, avatar,
+            self.username, self.level, self.rank, self.current_exp, self.max_exp, self.text_color, self.bar_color,
+            # a caller joining a render uses its executor and scheduler, so only equal ones share it. A caller
+            # holding a slot of the scheduler renders in it, joining a render queued for that slot would never finish
+            self.executor, self.scheduler, self.scheduler is not None and self.scheduler.holding
+        )
+
+    async def _render_cached(self, design: str, timings: Optional[RenderTimings], options: dict) -> bytes:
+        key = None
+        if render_cache.enabled:
+            with timed(timings, "render_cache"):
+                key, data = await run_in_executor(None, render_cache.lookup, self, design, options)
+            if data is not None:
+                return data
+        # identical and stored cards never wait for a slot of the scheduler
+        if self.scheduler is None:
+            result = await self._draw(design, timings, options)
+        else:
+            result = await self.scheduler.run(self._draw(design, timings, options))
+        data = result if isinstance(result, bytes) else result.getvalue()
+        if key is not None:
+            with timed(timings, "render_cache"):
+                await run_in_executor(None, render_cache.put, key, data)
+        return data
+
+    async def _draw(self, design: str, timings: Optional[RenderTimings], options: dict) -> Union[BytesIO, bytes]:
+        if isinstance(self.executor, ProcessRenderer):
+            if isinstance(self.avatar, str) and self.avatar.startswith("http"):
+                with timed(timings, "avatar_fetch"):
+                    avatar = await Sandbox._fetch_avatar(self.avatar, self._avatar_frame(design, options)[0])
+            elif isinstance(self.avatar, Image.Image):
+                with timed(timings, "avatar_encode"):
+                    avatar = await run_in_executor(None, encode_avatar, self.avatar)
+            else:
+                raise TypeError(f"avatar must be a url, not {type(self.avatar)}")
+            job = RenderJob(
+                design=design,
+                settings=self.executor.name_of(self.settings),
+                avatar=avatar,
+                username=self.username,
+                level=self.level,
+                current_exp=self.current_exp,
+                max_exp=self.max_exp,
+                rank=self.rank,
+                cacheing=self.cacheing,
+                options=options
+            )
+            if timings is not None:
+                timings.sizes["avatar"] = len(avatar)
+            with timed(timings, "render"):
+                data = await self.executor.render(job)
+            return data if options["output"].as_bytes else BytesIO(data)
+
+        if options["output"].animated:
+            image = await self._animated_avatar(*self._avatar_frame(design, options), timings)
+            if image is not None:
+                return await self._run(timings, render_animated, self, design, image, options)
+
+        avatar = await self._avatar(*self._avatar_frame(design, options), timings)
+        return await self._run(timings, getattr(self, "_" + design), avatar, **options)
+
+    @staticmethod
+    def _save(background: Image.Image, resize: int, output: Optional[Output] = None) -> Union[BytesIO, bytes]:
+        if resize != 100:
+            with stage("resize"):
+                background = background.resize((int(background.size[0]*(resize/100)), int(background.size[1]*(resize/100))))
+        with stage("encode"):
+            return (output or get_default_output()).encode(background)
 
     async def custom_card1(
             self,
             card_colour: str = "black",
-            resize: int = 100
-        )-> Union[None, bytes]:
+            resize: int = 100,
+            direct: bool = False,
+            output: Optional[Output] = None
+        )-> Union[BytesIO, bytes]:
         """
         Sandbox for first type of card and returns `bytes`
 
@@ -125,93 +412,84 @@ class Sandbox:
         resize: :class:`int`
             The size of the avatar. Default is `100`
 
+        direct: :class:`bool`
+            Whether to compose the card directly at its `resize` size instead of rendering it full size and resizing it.
+            Faster for small cards, the text is laid out at the target size so it can differ by a pixel. Default is `False`
+
+        output: Optional[:class:`Output`]
+            How the card is encoded, eg `Output.webp(quality=80)` or `Output.fast_png(as_bytes=True)`. Default is `None` which uses `get_default_output()` (`PNG` in a `BytesIO`)
+
         Attributes
         ----------
         - `card_colour`
         - `resize`
+        - `direct`
+        - `output`
 
         """
-        path = str(Path(__file__).parent)
-
-        if isinstance(self.avatar, str):
-            if self.avatar.startswith("http"):
-                self.avatar = await Sandbox._image(self.avatar)
-        elif isinstance(self.avatar, Image.Image):
-            pass
-        else:
-            raise TypeError(f"avatar must be a url, not {type(self.avatar)}") 
-
-        self.avatar = self.avatar.resize((170,170))
+        return await self._render("custom_card1", card_colour=card_colour, resize=resize, direct=direct, output=output)
 
-        if card_colour == "black":
-            overlay = Image.open(path + "/assets/overlay1.png")
-        elif Path(path + f"/assets/{card_colour.replace('#','')}_overlay1.png").is_file():
-            overlay = Image.open(path + f"/assets/{card_colour.replace('#','')}_overlay1.png")
-        else:
-            overlay = Image.open(path + "/assets/overlay1.png")
-            bg = overlay.convert("RGBA")
-            data = bg.load()
-
-            for x in range(bg.size[0]):
-                for y in range(bg.size[1]):
-                    if data[x,y] == (0,0,0,255):
-                        data[x,y] = ImageColor.getcolor(card_colour, "RGBA")
-            if self.cacheing:
-                bg.save(path + f"/assets/{card_colour.replace('#','')}_overlay1.png", 'PNG')
-            
-            overlay = bg
+    def _custom_card1_base(self, card_colour: str, scale: Scale) -> Image.Image:
+        size = scale.canvas((638, 327), (505, 259))
+        overlay = overlay_cache.get(card_colour, persist=self.cacheing)
+        if overlay.size != size:
+            overlay = overlay.resize(size)
         
-        background = Image.new("RGBA", overlay.size)
-        backgroundover = self.background.resize((638,159))
+        background = Image.new("RGBA", size)
+        backgroundover = self.background.resize((size[0], scale.size(159)))
         background.paste(backgroundover,(0,0))
         
-        self.background = background.resize(overlay.size)
-        self.background.paste(overlay,(0,0),overlay)
+        background.paste(overlay,(0,0),overlay)
+        return background
+
+    def _custom_card1(self, avatar: MaskedAvatar, card_colour: str, resize: int, direct: bool = False, output: Optional[Output] = None) -> Union[BytesIO, bytes]:
+        scale = Scale.of(resize, direct, CARD1_NATIVE)
+        base = base_layers.get(self.settings, ("custom_card1", card_colour, scale), lambda: self._custom_card1_base(card_colour, scale))
+        return member_cache.render(
+            member_cache.key(self, ("custom_card1", card_colour, scale)), base, self._numbers(resize, direct, output),
+            lambda: self._custom_card1_member(base, avatar, scale),
+            lambda background: self._custom_card1_progress(background, card_colour, scale, resize, direct, output)
+        )
+
+    def _custom_card1_member(self, base: Image.Image, avatar: MaskedAvatar, scale: Scale) -> Image.Image:
+        background = base.copy()
+
+        myFont = fonts.get(DEFAULT_FONT, scale.size(40))
+        draw = ImageDraw.Draw(background)
 
-        myFont = ImageFont.truetype(path + "/assets/levelfont.otf",40)
-        draw = ImageDraw.Draw(self.background)
+        text_cache.draw(draw, scale.xy((205,(327/2)+20)), self.username,font=myFont, fill=self.text_color,stroke_width=scale.size(1),stroke_fill=(0, 0, 0))
+        background.paste(avatar.image, scale.xy((13, 65)), avatar.mask)
+        return background
+
+    def _custom_card1_progress(self, background: Image.Image, card_colour: str, scale: Scale, resize: int, direct: bool, output: Optional[Output]) -> Union[BytesIO, bytes]:
+        stroke = scale.size(1)
+        draw = ImageDraw.Draw(background)
 
-        draw.text((205,(327/2)+20), self.username,font=myFont, fill=self.text_color,stroke_width=1,stroke_fill=(0, 0, 0))
-        bar_exp = (self.current_exp/self.max_exp)*420
-        if bar_exp <= 50:
-            bar_exp = 50    
+        bar_exp = (self.current_exp/self.max_exp)*scale.px(420)
+        if bar_exp <= scale.px(50):
+            bar_exp = scale.px(50)
 
         current_exp = Sandbox._convert_number(self.current_exp)
         
         max_exp = Sandbox._convert_number(self.max_exp)
         
-        myFont = ImageFont.truetype(path + "/assets/levelfont.otf",30)
-        draw.text((197,(327/2)+125), f"LEVEL - {Sandbox._convert_number(self.level)}",font=myFont, fill=self.text_color,stroke_width=1,stroke_fill=(0, 0, 0))
+        myFont = fonts.get(DEFAULT_FONT, scale.size(30))
+        text_cache.draw(draw, scale.xy((197,(327/2)+125)), f"LEVEL - {Sandbox._convert_number(self.level)}",font=myFont, fill=self.text_color,stroke_width=stroke,stroke_fill=(0, 0, 0))
 
         w,_ = draw.textsize(f"{current_exp}/{max_exp}", font=myFont)
-        draw.text((638-w-50,(327/2)+125), f"{current_exp}/{max_exp}",font=myFont, fill=self.text_color,stroke_width=1,stroke_fill=(0, 0, 0))
+        text_cache.draw(draw, (scale.px(638-50)-w,scale.px((327/2)+125)), f"{current_exp}/{max_exp}",font=myFont, fill=self.text_color,stroke_width=stroke,stroke_fill=(0, 0, 0))
 
-        mask_im = Image.open(path + "/assets/mask_circle.jpg").convert('L').resize((170,170))
-        new = Image.new("RGB", self.avatar.size, (0, 0, 0))
-        try:
-            new.paste(self.avatar, mask=self.avatar.convert("RGBA").split()[3])
-        except Exception as e:
-            print(e)
-            new.paste(self.avatar, (0,0))
-        self.background.paste(new, (13, 65), mask_im)
-
-        im = Image.new("RGB", (490, 51), ImageColor.getcolor(card_colour, "RGB"))
-        draw = ImageDraw.Draw(im, "RGBA")
-        draw.rounded_rectangle((0, 0, 420, 50), 30, fill=(255,255,255,50))
-        if self.current_exp != 0:
-            draw.rounded_rectangle((0, 0, bar_exp, 50), 30, fill=self.bar_color)
-        self.background.paste(im, (190, 235))
-        new = Image.new("RGBA", self.background.size)
-        new.paste(self.background,(0, 0), Image.open(path + "/assets/curvedoverlay.png").convert("L"))
-        self.background = new.resize((505, 259))
-
-        image = BytesIO()
-        if resize != 100:
-            self.background = self.background.resize((int(self.background.size[0]*(resize/100)), int(self.background.size[1]*(resize/100))))
-        
-        self.background.save(image, 'PNG')
-        image.seek(0)
-        return image
+        bar = bar_cache.get("RGB", (scale.size(490), scale.size(51)), ImageColor.getcolor(card_colour, "RGB"), scale.px(420), scale.px(50), scale.px(30), (255,255,255,50))
+        im = bar.render(bar_exp, self.bar_color) if self.current_exp != 0 else bar.track
+        background.paste(im, scale.xy((190, 235)))
+        new = Image.new("RGBA", background.size)
+        new.paste(background,(0, 0), registry.mask("curvedoverlay.png", background.size))
+        if direct:
+            return Sandbox._save(new, 100, output)
+        with stage("resize"):
+            background = new.resize((505, 259))
+
+        return Sandbox._save(background, resize, output)
 
 
     async def custom_canvas(
@@ -247,10 +525,13 @@ class Sandbox:
             exp_bar_background_colour: Union[str, tuple] = "white",
             exp_bar_position:tuple = (330, 235),
             exp_bar_curve: int = 30,
-            extra_text: Union[List, None] = None
+            extra_text: Union[List, None] = None,
 
+            layout: Optional[CanvasLayout] = None,
+            output: Optional[Output] = None,
+            direct: bool = False
 
-        )-> Union[None, bytes]:
+        )-> Union[BytesIO, bytes]:
         """
         Sandbox for third type of card which returns "BytesIO"
 
@@ -267,7 +548,7 @@ class Sandbox:
         
         resize: :class:`int`
             The percentage to resize the image to. Default is 100
-                    
+
         overlay: :class:`list`
             A list of overlays to be placed on the background. Default is [[(1000-50, 333-50),(25, 25), "black", 200]].
 
@@ -321,7 +602,17 @@ class Sandbox:
 
         exp_bar: :class:`int`
             The calculated exp of the user. Default is None.
-        
+
+        layout: Optional[:class:`CanvasLayout`]
+            A layout compiled once and reused for every member, the other layout arguments are ignored when it is given. Default is `None`
+
+        output: Optional[:class:`Output`]
+            How the card is encoded, eg `Output.webp(quality=80)` or `Output.fast_png(as_bytes=True)`. Default is `None` which uses `get_default_output()` (`PNG` in a `BytesIO`)
+
+        direct: :class:`bool`
+            Whether to compose the card directly at its `resize` size instead of rendering it full size and resizing it.
+            Faster for small cards, the text is laid out at the target size so it can differ by a pixel. Default is `False`
+
 
         Attributes
         ----------
@@ -347,94 +638,96 @@ class Sandbox:
         - `exp_bar_curve`
         - `extra_text`
         - `exp_bar`
+        - `layout`
+        - `output`
+        - `direct`
         
         """
-        path = str(Path(__file__).parent)
-
-        if isinstance(self.avatar, str):
-            if self.avatar.startswith("http"):
-                self.avatar = await Sandbox._image(self.avatar)
-        elif isinstance(self.avatar, Image.Image):
-            pass
-        else:
-            raise TypeError(f"avatar must be a url, not {type(self.avatar)}") 
-
-        if has_background:
-            background = self.background.resize(canvas_size)
+        if layout is None:
+            layout = CanvasLayout(
+                has_background=has_background,
+                background_colour=background_colour,
+                canvas_size=canvas_size,
+                resize=resize,
+                direct=direct,
+                overlay=overlay,
+                avatar_frame=avatar_frame,
+                avatar_size=avatar_size,
+                avatar_position=avatar_position,
+                text_font=text_font,
+                username_position=username_position,
+                username_font_size=username_font_size,
+                level_position=level_position,
+                level_font_size=level_font_size,
+                exp_position=exp_position,
+                exp_font_size=exp_font_size,
+                bar_exp=bar_exp,
+                exp_bar_width=exp_bar_width,
+                exp_bar_height=exp_bar_height,
+                exp_bar_background_colour=exp_bar_background_colour,
+                exp_bar_position=exp_bar_position,
+                exp_bar_curve=exp_bar_curve,
+                extra_text=extra_text
+            )
+        return await self._render("custom_canvas", layout=layout, output=output)
+
+    def _custom_canvas_base(self, layout: CanvasLayout) -> Image.Image:
+        compiled = layout.compiled()
+        if layout.has_background:
+            background = self.background.resize(compiled.canvas_size)
         else:
-            background = Image.new("RGBA", canvas_size, ImageColor.getcolor(background_colour, "RGB"))
-        if overlay is not None:
-            for x in overlay:
-                cut = Image.new("RGBA", x[0] , ImageColor.getcolor(x[2], "RGB")+(x[3],))
-                background.paste(cut, x[1] ,cut)
-
-        avatar = self.avatar.resize((avatar_size, avatar_size))
-
-        if avatar_frame == "square":
-            mask = Image.new("RGBA", (avatar_size, avatar_size), "white")
-        elif avatar_frame == "circle":
-            mask = Image.open(path + "/assets/mask_circle.jpg").resize((avatar_size, avatar_size))
-        elif avatar_frame == "hexagon":
-            mask = Image.open(path + "/assets/mask_hexagon.png").resize((avatar_size, avatar_size))
-        else:
-            try:
-                mask = Image.open(avatar_frame).resize((avatar_size, avatar_size))
-            except:
-                mask = Image.open(path + "/assets/curveborder.png").resize((avatar_size, avatar_size))
-
-        new = Image.new("RGBA", avatar.size, (0, 0, 0))
-        try:
-            new.paste(avatar, mask=avatar.convert("RGBA").split()[3])
-        except:
-            new.paste(avatar, (0,0))
-        
-        background.paste(new, avatar_position, mask.convert("L"))
-
-        if text_font == "levelfont.otf":
-            fontname = path + "/assets/levelfont.otf"
-        else:
-            try:
-                fontname = text_font
-            except:
-                fontname = path + "/assets/levelfont.otf"
-
+            background = Image.new("RGBA", compiled.canvas_size, ImageColor.getcolor(layout.background_colour, "RGB"))
+        for size, position, colour in compiled.overlays:
+            cut = Image.new("RGBA", size, colour)
+            background.paste(cut, position, cut)
+        return background
+
+    def _custom_canvas(self, avatar: MaskedAvatar, layout: CanvasLayout, output: Optional[Output] = None) -> Union[BytesIO, bytes]:
+        base = base_layers.get(self.settings, ("custom_canvas", layout), lambda: self._custom_canvas_base(layout))
+        return member_cache.render(
+            member_cache.key(self, ("custom_canvas", layout)), base, self._numbers(layout.resize, layout.direct, output),
+            lambda: self._custom_canvas_member(base, avatar, layout),
+            lambda background: self._custom_canvas_progress(background, layout, output)
+        )
+
+    def _custom_canvas_member(self, base: Image.Image, avatar: MaskedAvatar, layout: CanvasLayout) -> Image.Image:
+        compiled = layout.compiled()
+        background = base.copy()
+
+        background.paste(avatar.image, compiled.avatar_position, avatar.mask)
+        return background
+
+    def _custom_canvas_progress(self, background: Image.Image, layout: CanvasLayout, output: Optional[Output]) -> Union[BytesIO, bytes]:
+        compiled = layout.compiled()
         draw = ImageDraw.Draw(background)
 
         if self.rank is not None:
             combined = "LEVEL: " + self._convert_number(self.level) + "       " + "RANK: " + str(self.rank)
         else:
             combined = "LEVEL: " + self._convert_number(self.level)
-        draw.text(level_position, combined,font=ImageFont.truetype(fontname,level_font_size), fill=self.text_color,stroke_width=1,stroke_fill=(0, 0, 0))
-        draw.text(username_position, self.username,font=ImageFont.truetype(fontname,username_font_size), fill=self.text_color,stroke_width=1,stroke_fill=(0, 0, 0))
-
-        if extra_text is not None and type(extra_text) == list:
-            for x in extra_text:
-                draw.text(x[1], x[0],font=ImageFont.truetype(fontname,x[2]), fill=(ImageColor.getcolor(x[3], "RGBA") if type(x[3]) != tuple else extra_text),stroke_width=1,stroke_fill=(0, 0, 0))
+        # the texts keep their order, the positions of a layout can make them overlap
+        text_cache.draw(draw, compiled.level_position, combined,font=compiled.level_font, fill=self.text_color,stroke_width=compiled.stroke,stroke_fill=(0, 0, 0))
+        text_cache.draw(draw, compiled.username_position, self.username,font=compiled.username_font, fill=self.text_color,stroke_width=compiled.stroke,stroke_fill=(0, 0, 0))
+        for text, position, font, colour in compiled.extra_text:
+            text_cache.draw(draw, position, text, font=font, fill=colour, stroke_width=compiled.stroke, stroke_fill=(0, 0, 0))
 
         exp = f"{self._convert_number(self.current_exp)}/{self._convert_number(self.max_exp)}"
-        draw.text(exp_position, exp,font=ImageFont.truetype(fontname,exp_font_size), fill=self.text_color,stroke_width=1,stroke_fill=(0, 0, 0))
+        text_cache.draw(draw, compiled.exp_position, exp,font=compiled.exp_font, fill=self.text_color,stroke_width=compiled.stroke,stroke_fill=(0, 0, 0))
 
-        if bar_exp == None:
+        exp_bar_width, exp_bar_height = compiled.bar_size
+        exp_bar_curve_custom = compiled.bar_curve
+        if layout.bar_exp == None:
             bar_exp = (self.current_exp/self.max_exp)*exp_bar_width
-            exp_bar_curve_custom = exp_bar_curve
         else:
-            bar_exp = bar_exp*exp_bar_width
+            bar_exp = layout.bar_exp*exp_bar_width
 
-        if bar_exp <= 50:
-            bar_exp = 50
-            exp_bar_curve_custom = exp_bar_curve//2
+        if bar_exp <= compiled.bar_minimum:
+            bar_exp = compiled.bar_minimum
+            exp_bar_curve_custom = compiled.bar_curve//2
 
-        im = Image.new("RGBA", (exp_bar_width+1, exp_bar_height+1))
-        draw = ImageDraw.Draw(im, "RGBA")
-        draw.rounded_rectangle((0, 0, exp_bar_width, exp_bar_height), exp_bar_curve, fill=(exp_bar_background_colour if type(exp_bar_background_colour) == tuple else ImageColor.getcolor(exp_bar_background_colour, "RGBA")))
-        if self.current_exp != 0:
-            draw.rounded_rectangle((0, 0, bar_exp, exp_bar_height), exp_bar_curve_custom, fill=self.bar_color)
+        bar = bar_cache.get("RGBA", (exp_bar_width+1, exp_bar_height+1), None, exp_bar_width, exp_bar_height, compiled.bar_curve, compiled.bar_background)
+        im = bar.render(bar_exp, self.bar_color, exp_bar_curve_custom) if self.current_exp != 0 else bar.track
 
-        background.paste(im, exp_bar_position, im.convert("RGBA"))
+        background.paste(im, compiled.bar_position, im)
 
-        image = BytesIO()
-        if resize != 100:
-            background = background.resize((int(background.size[0]*(resize/100)), int(background.size[1]*(resize/100))))
-        background.save(image, 'PNG')
-        image.seek(0)
-        return image
\ No newline at end of file
+        return Sandbox._save(background, 100 if layout.direct else layout.resize, output)
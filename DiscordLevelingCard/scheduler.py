@@ -0,0 +1,161 @@
+import asyncio
+import inspect
+import os
+from collections import deque
+from contextlib import suppress
+from contextvars import ContextVar
+from typing import Any, Awaitable, Deque, Dict, FrozenSet, Optional
+
+from .error import RenderDeadlineExceeded, RenderQueueFull
+
+# the schedulers whose slot the current render holds, a render nested in it does not take a second slot
+_holding: ContextVar[FrozenSet[int]] = ContextVar("holding", default=frozenset())
+
+
+class RenderScheduler:
+    """Admission control in front of the card methods
+
+    At most `max_in_flight` renders run at once and at most `max_queue` wait
+    for a free slot. A render arriving at a full queue is rejected with
+    :class:`RenderQueueFull` right away, and a render still waiting when its
+    deadline passes is dropped with :class:`RenderDeadlineExceeded` before it
+    starts, so the renders that do run can answer in time.
+
+    Pass it as the `scheduler` of :class:`RankCard` or :class:`Sandbox`, or run
+    any card method through :meth:`run` to give it its own deadline. A render
+    run inside a render holding a slot of the same scheduler, eg a card with
+    this `scheduler` passed to :meth:`run`, uses the slot it is in.
+
+    ```py
+    scheduler = RenderScheduler(max_in_flight=4, max_queue=32, deadline=2.5)
+    image = await scheduler.run(card.card2(), deadline=2.0)
+    ```
+
+    Parameters
+    ----------
+    max_in_flight: Optional[:class:`int`]
+        The most renders running at once. Default is `None` which is the number of CPUs
+
+    max_queue: :class:`int`
+        The most renders waiting for a slot. Default is `64`
+
+    deadline: Optional[:class:`float`]
+        Seconds a render may wait for a slot, `None` waits forever. Default is `None`
+
+    Attributes
+    ----------
+    - `max_in_flight`
+    - `max_queue`
+    - `deadline`
+    - `running`
+        The number of renders running
+    - `holding`
+        Whether the current render holds a slot
+    - `completed`
+    - `rejected`
+    - `expired`
+
+    Methods
+    -------
+    - `run`
+        awaits a render once a slot is free
+    - `stats`
+        returns the counters as a `dict`
+    """
+
+    __slots__ = ('max_in_flight', 'max_queue', 'deadline', 'running', 'completed', 'rejected', 'expired', '_queue')
+
+    def __init__(self, max_in_flight: Optional[int] = None, max_queue: int = 64, deadline: Optional[float] = None) -> None:
+        self.max_in_flight = max_in_flight or os.cpu_count() or 4
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.expired = 0
+        self._queue: Deque[asyncio.Future] = deque()
+
+    @property
+    def holding(self) -> bool:
+        """Whether the current render holds a slot of this scheduler"""
+        return id(self) in _holding.get()
+
+    def _release(self) -> None:
+        # hands the slot to the first waiting render
+        while self._queue:
+            waiter = self._queue.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.running -= 1
+
+    async def _acquire(self, deadline: Optional[float]) -> None:
+        if self.running < self.max_in_flight and not self._queue:
+            self.running += 1
+            return
+        if len(self._queue) >= self.max_queue:
+            self.rejected += 1
+            raise RenderQueueFull(f"{len(self._queue)} renders are already waiting")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queue.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, deadline)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            self.expired += 1
+            raise RenderDeadlineExceeded(f"the render waited longer than its deadline of {deadline} seconds") from None
+        except BaseException:
+            # cancelled after the slot was handed over
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+        finally:
+            with suppress(ValueError):
+                self._queue.remove(waiter)
+
+    async def run(self, render: Awaitable[Any], deadline: Optional[float] = None) -> Any:
+        """awaits `render` (eg `card.card2()`) once a slot is free and returns its result
+
+        Parameters
+        ----------
+        render: :class:`Awaitable`
+            The render, a coroutine is only started once it has a slot
+
+        deadline: Optional[:class:`float`]
+            Seconds the render may wait for a slot. Default is `None` which uses the scheduler's `deadline`
+
+        Raises
+        ------
+        - `RenderQueueFull`
+            If `max_queue` renders are already waiting
+        - `RenderDeadlineExceeded`
+            If the render did not get a slot before its deadline
+        """
+        holding = _holding.get()
+        if id(self) in holding:
+            return await render
+        try:
+            await self._acquire(self.deadline if deadline is None else deadline)
+        except BaseException:
+            if inspect.iscoroutine(render):
+                render.close()
+            raise
+        token = _holding.set(holding | {id(self)})
+        try:
+            return await render
+        finally:
+            _holding.reset(token)
+            self.completed += 1
+            self._release()
+
+    def stats(self) -> Dict[str, int]:
+        """returns the counters"""
+        return {
+            "running": self.running,
+            "queued": len(self._queue),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "expired": self.expired,
+        }
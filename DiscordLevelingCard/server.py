@@ -0,0 +1,421 @@
+"""Render server, run it with `python -m DiscordLevelingCard.server --settings default=background.png`
+
+A small aiohttp web service rendering the cards for many bot processes, so
+only the rendering hosts load Pillow, the fonts and the assets. A card is
+requested with a JSON spec and returned encoded:
+
+```
+POST /render
+{"design": "card1", "settings": "default", "avatar": "https://cdn.discordapp.com/avatars/...",
+ "username": "member", "level": 3, "current_exp": 20, "max_exp": 100, "rank": 1,
+ "options": {"resize": 50}, "output": {"format": "WEBP", "quality": 80}}
+```
+
+`GET /health` returns the counters of the caches, the scheduler and the coalesced renders.
+"""
+import argparse
+import asyncio
+import base64
+import binascii
+import inspect
+import json
+import sys
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple, Union
+from urllib.parse import urlsplit
+
+from aiohttp import ClientError, web
+from PIL import ImageColor, UnidentifiedImageError
+
+from .avatar_cache import FRAMES
+from .canvas_layout import CanvasLayout
+from .card_settings import Settings
+from .discord_card import RankCard
+from .discord_cdn import CDN_HOSTS
+from .error import DiscordLevelingCardError, ImageTooLarge, InvalidCardSpec, InvalidImageUrl, RenderDeadlineExceeded, RenderQueueFull
+from .executor import shutdown_executor
+from .http_session import close_session
+from .image_loader import image_limits, open_image
+from .output import Output, get_default_output
+from .process_pool import ProcessRenderer
+from .render_cache import render_cache
+from .sandbox import Sandbox
+from .scheduler import RenderScheduler
+from .single_flight import renders
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+CONTENT_TYPES = {"PNG": "image/png", "APNG": "image/apng", "WEBP": "image/webp", "JPEG": "image/jpeg", "GIF": "image/gif"}
+
+# bounds of a spec, so one request can not make the server draw a huge card
+MAX_USERNAME = 256
+MAX_RESIZE = 200
+# every number of an option is a coordinate, a size or a font size
+MAX_DIMENSION = 4096
+MAX_CANVAS_PIXELS = 4_000_000
+# `layout` is a python object and `text_font` a path on the server, they can not be sent in a spec
+REJECTED_OPTIONS = ("layout", "text_font")
+AVATAR_FRAMES = tuple(FRAMES) + ("square",)
+# the integer fields of `output` and their ranges, `None` keeps Pillow's default
+OUTPUT_RANGES = {"compress_level": (0, 9), "quality": (1, 100), "method": (0, 6), "colors": (2, 256), "max_frames": (0, 1000), "max_duration": (0, 60000)}
+
+
+def _integer(name: str, value: Any, low: int, high: Optional[int] = None) -> int:
+    if not isinstance(value, int) or isinstance(value, bool) or value < low or (high is not None and value > high):
+        bounds = f"from {low} to {high}" if high is not None else f"of at least {low}"
+        raise InvalidCardSpec(f"{name} must be an integer {bounds}, not {value!r}")
+    return value
+
+
+def _boolean(name: str, value: Any) -> bool:
+    if not isinstance(value, bool):
+        raise InvalidCardSpec(f"{name} must be true or false, not {value!r}")
+    return value
+
+
+def _colour(name: str, value: Any) -> None:
+    if isinstance(value, str):
+        try:
+            ImageColor.getrgb(value)
+            return
+        except ValueError:
+            pass
+    elif isinstance(value, (list, tuple)) and len(value) in (3, 4) and all(isinstance(x, int) and not isinstance(x, bool) and 0 <= x <= 255 for x in value):
+        return
+    raise InvalidCardSpec(f"{name} must be a colour name, a hex colour or 3 or 4 integers from 0 to 255, not {value!r}")
+
+
+def _bounded(name: str, value: Any) -> None:
+    # the values of an option are strings, booleans, numbers and lists of them
+    if value is None or isinstance(value, (str, bool)):
+        return
+    if isinstance(value, (int, float)):
+        if not -MAX_DIMENSION <= value <= MAX_DIMENSION:
+            raise InvalidCardSpec(f"{name} holds {value!r}, the numbers of an option are at most {MAX_DIMENSION}")
+        return
+    if isinstance(value, list):
+        for item in value:
+            _bounded(name, item)
+        return
+    raise InvalidCardSpec(f"{name} can not hold a JSON object")
+
+
+def _layout(options: Dict[str, Any]) -> CanvasLayout:
+    # `custom_canvas` options checked as a :class:`CanvasLayout`, the card draws it as it is
+    if "avatar_frame" in options and options["avatar_frame"] not in AVATAR_FRAMES:
+        raise InvalidCardSpec(f"avatar_frame must be one of {', '.join(AVATAR_FRAMES)}, not {options['avatar_frame']!r}")
+    if "has_background" in options:
+        _boolean("has_background", options["has_background"])
+    for name in ("bar_exp", "exp_bar_curve"):
+        value = options.get(name)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise InvalidCardSpec(f"{name} must be a number, not {value!r}")
+    try:
+        layout = CanvasLayout(**options)
+    except (TypeError, ValueError, IndexError) as error:
+        raise InvalidCardSpec(str(error)) from None
+
+    width = _integer("canvas_size width", layout.canvas_size[0], 1, MAX_DIMENSION)
+    height = _integer("canvas_size height", layout.canvas_size[1], 1, MAX_DIMENSION)
+    # a card that is not `direct` is drawn full size and then resized
+    if width * height * max(1, layout.resize / 100) ** 2 > MAX_CANVAS_PIXELS:
+        raise InvalidCardSpec(f"canvas_size {width}x{height} at resize {layout.resize} is over {MAX_CANVAS_PIXELS} pixels")
+
+    _colour("background_colour", layout.background_colour)
+    _colour("exp_bar_background_colour", layout.exp_bar_background_colour)
+    for _, _, colour, alpha in layout.overlay or ():
+        _colour("overlay colour", colour)
+        _integer("overlay alpha", alpha, 0, 255)
+    for _, _, _, colour in layout.extra_text or ():
+        _colour("extra_text colour", colour)
+    return layout
+
+
+def _design_options(card_class: type, design: str) -> Tuple[str, ...]:
+    # the keyword arguments of the card method, `output` is set from the spec's own field
+    parameters = inspect.signature(getattr(card_class, design)).parameters
+    return tuple(name for name in parameters if name not in ("self", "output"))
+
+
+DESIGNS: Dict[str, Tuple[type, Tuple[str, ...]]] = {
+    design: (card_class, _design_options(card_class, design))
+    for card_class in (RankCard, Sandbox)
+    for design in card_class._designs
+}
+
+
+class RenderServer:
+    """Renders cards from JSON specs over HTTP
+
+    The cards are rendered with the caches of the library, in the shared
+    executor or in the worker processes of a :class:`ProcessRenderer`, behind
+    a :class:`RenderScheduler` answering `503` when it is full.
+
+    Parameters
+    ----------
+    settings: :class:`Dict[str, Settings]`
+        The settings a spec can reference, by name
+
+    processes: Optional[:class:`int`]
+        Renders in a :class:`ProcessRenderer` with that many workers instead of the shared executor. Default is `None`
+
+    scheduler: Optional[:class:`RenderScheduler`]
+        Bounds the renders running and waiting at once. Default is `None` which is a `RenderScheduler()`
+
+    client_max_size: :class:`int`
+        The largest request body in bytes. Default is `None` which fits an `avatar_base64` of `image_limits.max_bytes`
+
+    avatar_hosts: Optional[:class:`Iterable[str]`]
+        The hosts (`host` or `host:port`) an avatar url can be downloaded from. Default is `None` which is `CDN_HOSTS`
+
+    Attributes
+    ----------
+    - `settings`
+    - `scheduler`
+    - `executor`
+    - `avatar_hosts`
+
+    Methods
+    -------
+    - `application`
+        returns the :class:`aiohttp.web.Application`
+    - `card`
+        returns the card, the design and the card method options of a spec
+    - `render`
+        renders a spec and returns the encoded card and its content type
+    - `run`
+        serves until interrupted
+    """
+
+    __slots__ = ('settings', 'scheduler', 'executor', 'client_max_size', 'avatar_hosts')
+
+    def __init__(
+        self,
+        settings: Dict[str, Settings],
+        processes: Optional[int] = None,
+        scheduler: Optional[RenderScheduler] = None,
+        client_max_size: Optional[int] = None,
+        avatar_hosts: Optional[Iterable[str]] = None
+    ) -> None:
+        if not settings:
+            raise DiscordLevelingCardError("RenderServer needs at least one Settings")
+        self.settings = dict(settings)
+        self.scheduler = scheduler or RenderScheduler()
+        self.executor = ProcessRenderer(self.settings, processes) if processes else None
+        self.client_max_size = client_max_size or (image_limits.max_bytes or 16 * 1024 * 1024) * 4 // 3 + 64 * 1024
+        # the server only downloads from these hosts, a spec can not make it request any other url
+        self.avatar_hosts = CDN_HOSTS if avatar_hosts is None else tuple(avatar_hosts)
+
+    def _avatar(self, spec: Dict[str, Any]) -> Any:
+        avatar = spec.get("avatar")
+        if isinstance(avatar, str) and avatar.startswith(("http://", "https://")):
+            parts = urlsplit(avatar)
+            if parts.hostname not in self.avatar_hosts and parts.netloc not in self.avatar_hosts:
+                raise InvalidCardSpec(f"avatar must be a url on {', '.join(self.avatar_hosts)}, not {parts.netloc!r}")
+            return avatar
+        encoded = spec.get("avatar_base64")
+        if isinstance(encoded, str):
+            try:
+                data = base64.b64decode(encoded, validate=True)
+            except (binascii.Error, ValueError):
+                raise InvalidCardSpec("avatar_base64 is not valid base64") from None
+            try:
+                return open_image(data, name="avatar")
+            except UnidentifiedImageError:
+                raise InvalidCardSpec("avatar_base64 is not an image") from None
+        raise InvalidCardSpec("avatar must be an http(s) url or avatar_base64 the encoded image")
+
+    def card(self, spec: Dict[str, Any]) -> Tuple[Union[RankCard, Sandbox], str, Dict[str, Any]]:
+        """returns the card, the design and the card method options described by `spec`
+
+        Raises
+        ------
+        - `InvalidCardSpec`
+            If `spec` is invalid
+        """
+        if not isinstance(spec, dict):
+            raise InvalidCardSpec("the spec must be a JSON object")
+        design = spec.get("design", "card1")
+        if design not in DESIGNS:
+            raise InvalidCardSpec(f"design must be one of {', '.join(DESIGNS)}, not {design!r}")
+        card_class, allowed = DESIGNS[design]
+
+        settings = self.settings.get(spec.get("settings", "default"))
+        if settings is None:
+            raise InvalidCardSpec(f"settings must be one of {', '.join(self.settings)}, not {spec.get('settings', 'default')!r}")
+
+        username = spec.get("username")
+        if not isinstance(username, str) or len(username) > MAX_USERNAME:
+            raise InvalidCardSpec(f"username must be a string of at most {MAX_USERNAME} characters")
+        member = {
+            "username": username,
+            "level": _integer("level", spec.get("level"), 0),
+            "current_exp": _integer("current_exp", spec.get("current_exp"), 0),
+            # the bar is filled to current_exp / max_exp
+            "max_exp": _integer("max_exp", spec.get("max_exp"), 1),
+            "rank": None if spec.get("rank") is None else _integer("rank", spec["rank"], 0),
+        }
+
+        options = RenderServer._options(design, allowed, spec.get("options") or {})
+        card = card_class(
+            settings=settings,
+            avatar=self._avatar(spec),
+            executor=self.executor,
+            scheduler=self.scheduler,
+            **member
+        )
+        return card, design, dict(options, output=RenderServer._output(spec.get("output") or {}))
+
+    @staticmethod
+    def _options(design: str, allowed: Tuple[str, ...], options: Any) -> Dict[str, Any]:
+        if not isinstance(options, dict):
+            raise InvalidCardSpec("options must be a JSON object")
+        for name in REJECTED_OPTIONS:
+            if name in options:
+                raise InvalidCardSpec(f"{name} can not be set in a spec")
+        unknown = set(options) - set(allowed)
+        if unknown:
+            raise InvalidCardSpec(f"{design} has no option {', '.join(sorted(unknown))}, the options are {', '.join(allowed)}")
+
+        for name, value in options.items():
+            _bounded(name, value)
+        if "resize" in options:
+            _integer("resize", options["resize"], 1, MAX_RESIZE)
+        if "direct" in options:
+            _boolean("direct", options["direct"])
+        if "card_colour" in options:
+            _colour("card_colour", options["card_colour"])
+        if design == "custom_canvas":
+            return {"layout": _layout(options)}
+        return options
+
+    @staticmethod
+    def _output(fields: Any) -> Output:
+        if not isinstance(fields, dict) or set(fields) - (set(Output._fields) - {"as_bytes"}):
+            raise InvalidCardSpec(f"output must be a JSON object of {', '.join(field for field in Output._fields if field != 'as_bytes')}")
+        if isinstance(fields.get("format"), str):
+            fields = dict(fields, format=fields["format"].upper())
+        for name, (low, high) in OUTPUT_RANGES.items():
+            if fields.get(name) is not None:
+                _integer(name, fields[name], low, high)
+        for name in ("optimize", "lossless"):
+            if name in fields:
+                _boolean(name, fields[name])
+        output = get_default_output()._replace(**fields, as_bytes=True)
+        if output.format not in CONTENT_TYPES:
+            raise InvalidCardSpec(f"output format must be one of {', '.join(CONTENT_TYPES)}, not {output.format!r}")
+        return output
+
+    async def render(self, spec: Dict[str, Any]) -> Tuple[bytes, str]:
+        """renders the card described by `spec` and returns the encoded card and its content type"""
+        card, design, options = self.card(spec)
+        data = await getattr(card, design)(**options)
+        return data, CONTENT_TYPES[options["output"].format]
+
+    @staticmethod
+    def _error(status: int, error: Exception, **headers: str) -> web.Response:
+        return web.json_response({"error": type(error).__name__, "message": str(error)}, status=status, headers=headers)
+
+    async def _render(self, request: web.Request) -> web.Response:
+        try:
+            spec = await request.json()
+        except ValueError as error:
+            return RenderServer._error(400, InvalidCardSpec(f"the body is not JSON: {error}"))
+        try:
+            data, content_type = await self.render(spec)
+        except (InvalidCardSpec, InvalidImageUrl, ValueError) as error:
+            return RenderServer._error(400, error)
+        except ImageTooLarge as error:
+            return RenderServer._error(413, error)
+        except RenderQueueFull as error:
+            return RenderServer._error(503, error, **{"Retry-After": "1"})
+        except RenderDeadlineExceeded as error:
+            return RenderServer._error(503, error)
+        except ClientError as error:
+            return RenderServer._error(502, error)
+        except asyncio.TimeoutError as error:
+            return RenderServer._error(504, error)
+        except OSError as error:
+            # an avatar Pillow can not decode, a downloaded one is the fault of its host
+            fetched = isinstance(spec.get("avatar"), str) and spec["avatar"].startswith(("http://", "https://"))
+            return RenderServer._error(502 if fetched else 400, error)
+        return web.Response(body=data, content_type=content_type)
+
+    async def _health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "settings": list(self.settings),
+            "processes": self.executor.max_workers if self.executor is not None else None,
+            "scheduler": self.scheduler.stats(),
+            "render_cache": render_cache.stats(),
+            "renders": renders.stats(),
+        })
+
+    async def _start(self, app: web.Application) -> None:
+        if self.executor is not None:
+            await self.executor.start()
+
+    async def _stop(self, app: web.Application) -> None:
+        await close_session()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def application(self) -> web.Application:
+        """returns the :class:`aiohttp.web.Application` serving `POST /render` and `GET /health`"""
+        app = web.Application(client_max_size=self.client_max_size)
+        app.router.add_post("/render", self._render)
+        app.router.add_get("/health", self._health)
+        app.on_startup.append(self._start)
+        app.on_cleanup.append(self._stop)
+        return app
+
+    def run(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+        """serves on `host`:`port` until interrupted"""
+        try:
+            web.run_app(self.application(), host=host, port=port)
+        finally:
+            shutdown_executor()
+
+
+def _settings(values: Sequence[str], config: Optional[str]) -> Dict[str, Settings]:
+    specs: Dict[str, Dict[str, Any]] = {}
+    if config:
+        with open(config) as file:
+            specs.update(json.load(file))
+    for value in values:
+        name, _, background = value.partition("=")
+        if not name or not background:
+            raise ValueError(f"--settings must be NAME=BACKGROUND, not {value!r}")
+        specs[name] = {"background": background}
+    return {name: Settings(**spec) for name, spec in specs.items()}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m DiscordLevelingCard.server", description="Serves the cards over HTTP, rendered from JSON specs.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"address to listen on (default {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port to listen on (default {DEFAULT_PORT})")
+    parser.add_argument("-s", "--settings", action="append", default=[], metavar="NAME=BACKGROUND", help="settings a spec can reference, a background path or url by name")
+    parser.add_argument("--config", help="a JSON file of settings by name, each the keyword arguments of Settings")
+    parser.add_argument("-p", "--processes", type=int, default=None, help="render in a ProcessRenderer with that many workers")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="renders running at once (default the number of CPUs)")
+    parser.add_argument("--max-queue", type=int, default=64, help="renders waiting for a slot before answering 503 (default 64)")
+    parser.add_argument("--deadline", type=float, default=None, help="seconds a render may wait for a slot before answering 503")
+    parser.add_argument("--cache-dir", help="directory of the persistent render cache")
+    parser.add_argument("--avatar-host", action="append", default=None, metavar="HOST", help=f"host an avatar url can be downloaded from, repeatable (default {' '.join(CDN_HOSTS)})")
+    args = parser.parse_args(argv)
+
+    try:
+        settings = _settings(args.settings, args.config)
+    except (OSError, ValueError, TypeError, DiscordLevelingCardError) as error:
+        parser.error(str(error))
+    if not settings:
+        parser.error("at least one --settings or a --config is required")
+    if args.cache_dir:
+        render_cache.directory = args.cache_dir
+
+    scheduler = RenderScheduler(args.max_in_flight, args.max_queue, args.deadline)
+    RenderServer(settings, args.processes, scheduler, avatar_hosts=args.avatar_host).run(args.host, args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one
+
+    The first call of a key starts the work as a task, the calls of the same
+    key made while it runs await that task and all receive its result (or its
+    exception). A cancelled caller only stops waiting, the shared work keeps
+    running for the other callers.
+
+    Attributes
+    ----------
+    - `started`
+        Calls that started the work
+    - `joined`
+        Calls that awaited work started by another call
+
+    Methods
+    -------
+    - `run`
+        runs the work of a key once for every concurrent caller
+    - `stats`
+        returns the counters as a `dict`
+    """
+
+    __slots__ = ('started', 'joined', '_flights')
+
+    def __init__(self) -> None:
+        self.started = 0
+        self.joined = 0
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+
+    def _done(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        # every caller may have been cancelled, the exception is still retrieved
+        if not task.cancelled():
+            task.exception()
+
+    async def run(self, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Any:
+        """returns the result of `work()`, shared with every concurrent call of `key`"""
+        loop = asyncio.get_running_loop()
+        task = self._flights.get(key)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(work())
+            self._flights[key] = task
+            task.add_done_callback(lambda task, key=key: self._done(key, task))
+            self.started += 1
+        else:
+            self.joined += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        """returns the counters"""
+        return {"in_flight": len(self._flights), "started": self.started, "joined": self.joined}
+
+
+# identical renders and downloads running at the same time
+renders = SingleFlight()
+downloads = SingleFlight()
@@ -0,0 +1,129 @@
+import math
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional, Tuple, Union
+
+from PIL import ImageDraw, ImageFont
+
+from .timings import stage
+
+Colour = Union[str, Tuple[int, ...]]
+
+
+class TextCache:
+    """Bounded cache of rasterized text
+
+    Drawing stroked text rasterizes it twice with FreeType (the stroke and the
+    fill). The masks of both are kept in a least recently used cache keyed by
+    the text, the font, the stroke width and the sub-pixel start of the text,
+    so a username or label that was drawn before is only blended onto the
+    card. The colours are applied when the mask is blended, so the same
+    sprite is shared by every colour.
+
+    Parameters
+    ----------
+    maxsize: :class:`int`
+        The maximum number of masks to keep, `0` disables the cache. Default is `1024`
+
+    Attributes
+    ----------
+    - `maxsize`
+    - `hits`
+    - `misses`
+
+    Methods
+    -------
+    - `draw`
+        draws text like `ImageDraw.text`
+    - `stats`
+        returns the counters as a `dict`
+    - `clear`
+        drops every cached mask
+    """
+
+    __slots__ = ('maxsize', 'hits', 'misses', '_lock', '_sprites')
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._sprites: "OrderedDict[Hashable, Tuple[Any, Tuple[int, int]]]" = OrderedDict()
+
+    def _sprite(self, text: str, font: ImageFont.FreeTypeFont, stroke_width: int, start: Tuple[float, float]) -> Tuple[Any, Tuple[int, int]]:
+        # the font object itself is part of the key, so an evicted font can not be confused with a new one
+        key = (text, font, stroke_width, start)
+        with self._lock:
+            sprite = self._sprites.get(key)
+            if sprite is not None:
+                self._sprites.move_to_end(key)
+                self.hits += 1
+                return sprite
+            self.misses += 1
+
+        sprite = font.getmask2(text, "L", stroke_width=stroke_width, start=start)
+        with self._lock:
+            sprite = self._sprites.setdefault(key, sprite)
+            self._sprites.move_to_end(key)
+            while len(self._sprites) > self.maxsize:
+                self._sprites.popitem(last=False)
+        return sprite
+
+    @staticmethod
+    def _ink(draw: ImageDraw.ImageDraw, fill: Optional[Colour]) -> Optional[int]:
+        ink, fill = draw._getink(fill)
+        return fill if ink is None else ink
+
+    def draw(
+        self,
+        draw: ImageDraw.ImageDraw,
+        xy: Tuple[float, float],
+        text: str,
+        font: ImageFont.FreeTypeFont,
+        fill: Optional[Colour] = None,
+        stroke_width: int = 0,
+        stroke_fill: Optional[Colour] = None
+    ) -> None:
+        """draws `text` at `xy` on `draw` exactly like `draw.text(xy, text, font=font, fill=fill, stroke_width=stroke_width, stroke_fill=stroke_fill)`"""
+        with stage("text"):
+            self._draw(draw, xy, text, font, fill, stroke_width, stroke_fill)
+
+    def _draw(
+        self,
+        draw: ImageDraw.ImageDraw,
+        xy: Tuple[float, float],
+        text: str,
+        font: ImageFont.FreeTypeFont,
+        fill: Optional[Colour],
+        stroke_width: int,
+        stroke_fill: Optional[Colour]
+    ) -> None:
+        if self.maxsize <= 0 or draw.fontmode != "L" or not isinstance(font, ImageFont.FreeTypeFont) or "\n" in text or "\r" in text:
+            draw.text(xy, text, font=font, fill=fill, stroke_width=stroke_width, stroke_fill=stroke_fill)
+            return
+
+        ink = TextCache._ink(draw, fill)
+        if ink is None:
+            return
+        coord = (int(xy[0]), int(xy[1]))
+        start = (math.modf(xy[0])[0], math.modf(xy[1])[0])
+
+        if stroke_width:
+            stroke_ink = TextCache._ink(draw, stroke_fill) if stroke_fill is not None else ink
+            mask, offset = self._sprite(text, font, stroke_width, start)
+            draw.draw.draw_bitmap((coord[0] + offset[0], coord[1] + offset[1]), mask, stroke_ink)
+        mask, offset = self._sprite(text, font, 0, start)
+        draw.draw.draw_bitmap((coord[0] + offset[0], coord[1] + offset[1]), mask, ink)
+
+    def stats(self) -> Dict[str, int]:
+        """returns the cache counters"""
+        with self._lock:
+            return {"entries": len(self._sprites), "hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        """drops every cached mask, the counters are kept"""
+        with self._lock:
+            self._sprites.clear()
+
+
+text_cache = TextCache()
@@ -0,0 +1,125 @@
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+_local = threading.local()
+_untimed = nullcontext()
+
+
+class RenderTimings:
+    """The stage timings and byte sizes of one render, passed to the `timings_hook` of a card
+
+    Every stage is timed exclusively, a stage running inside another one is
+    not counted twice, so the stages add up to the time spent rendering. A
+    stage that ran several times (eg `text`) holds the sum of its runs.
+
+    Stages
+    ------
+    - `avatar_fetch` downloading the avatar
+    - `queue` waiting for a free executor thread
+    - `avatar_decode` decoding the avatar
+    - `avatar_resize` resizing and masking the avatar
+    - `base` building the static base layer, only when it was not cached
+    - `member` pasting the avatar and drawing the username
+    - `progress` drawing level, rank and exp
+    - `text` drawing text
+    - `bar` drawing the XP bar
+    - `resize` resizing the finished card
+    - `encode` encoding the card
+    - `render` the whole render in a :class:`ProcessRenderer` worker
+
+    Attributes
+    ----------
+    - `design`
+        The card method, eg `card1`
+    - `stages`
+        `dict` of stage name to seconds
+    - `sizes`
+        `dict` of `avatar` (downloaded bytes) and `output` (encoded card bytes)
+    - `total`
+        Seconds from the call of the card method until it returned
+    - `error`
+        The exception the render failed with, `None` if it succeeded
+
+    Methods
+    -------
+    - `stage`
+        context manager timing a stage
+    - `run`
+        runs a function recording its stages in the current thread
+    """
+
+    __slots__ = ('design', 'stages', 'sizes', 'total', 'error', '_stack', '_start')
+
+    def __init__(self, design: str) -> None:
+        self.design = design
+        self.stages: Dict[str, float] = {}
+        self.sizes: Dict[str, int] = {}
+        self.total = 0.0
+        self.error: Optional[BaseException] = None
+        # seconds spent in the nested stages of every running stage
+        self._stack: List[float] = []
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """times the block as the stage `name`"""
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._stack.pop()
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed - nested
+            if self._stack:
+                self._stack[-1] += elapsed
+
+    def add(self, name: str, seconds: float) -> None:
+        """adds `seconds` to the stage `name`"""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        if self._stack:
+            self._stack[-1] += seconds
+
+    def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Callable[[], Any]:
+        """returns a function calling `func` with the stages timed by :func:`stage` recorded here
+
+        The time between this call and the start of the function is the `queue` stage.
+        """
+        submitted = time.perf_counter()
+
+        def timed():
+            self.add("queue", time.perf_counter() - submitted)
+            previous = getattr(_local, "timings", None)
+            _local.timings = self
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _local.timings = previous
+        return timed
+
+    def finish(self, error: Optional[BaseException] = None) -> "RenderTimings":
+        self.total = time.perf_counter() - self._start
+        self.error = error
+        return self
+
+    def __repr__(self) -> str:
+        stages = ", ".join(f"{name}={seconds*1000:.2f}ms" for name, seconds in self.stages.items())
+        return f"<RenderTimings design={self.design!r} total={self.total*1000:.2f}ms {stages} sizes={self.sizes}>"
+
+
+def stage(name: str):
+    """times the block as the stage `name` of the render running in this thread, does nothing when it is not timed"""
+    timings = getattr(_local, "timings", None)
+    if timings is None:
+        return _untimed
+    return timings.stage(name)
+
+
+def timed(timings: Optional[RenderTimings], name: str):
+    """times the block as the stage `name` of `timings`, does nothing when `timings` is `None`"""
+    if timings is None:
+        return _untimed
+    return timings.stage(name)
+
@@ -0,0 +1,69 @@
+import io
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+import pytest
+from aiohttp import web
+
+from DiscordLevelingCard import Settings, avatar_cache, close_session, member_cache
+from DiscordLevelingCard.benchmark import synthetic_avatar, synthetic_background
+
+
+@pytest.fixture
+def settings():
+    return Settings(background=synthetic_background(), bar_color="#e9c46a")
+
+
+@lru_cache(maxsize=None)
+def _avatar():
+    buffer = io.BytesIO()
+    synthetic_avatar(256).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=None)
+def _animated_avatar():
+    buffer = io.BytesIO()
+    frames = [synthetic_avatar(256, seed).convert("RGB") for seed in range(3)]
+    frames[0].save(buffer, "GIF", save_all=True, append_images=frames[1:], duration=100, loop=0)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def avatar_server():
+    """serves a synthetic PNG avatar on localhost, yields its url
+
+    Any path is served, `/animated.gif` is an animated avatar and `/broken.png` is not an image.
+    `serve.requests` lists the path and query of every request and `serve.rejects_size`
+    answers `404` to a request with a `size`, like a CDN refusing it.
+    """
+    async def avatar(request):
+        serve.requests.append(request.path_qs)
+        if serve.rejects_size and "size" in request.query:
+            raise web.HTTPNotFound()
+        if request.match_info["name"] == "broken.png":
+            return web.Response(body=b"not an image", content_type="image/png")
+        if request.match_info["name"] == "animated.gif":
+            return web.Response(body=_animated_avatar(), content_type="image/gif")
+        return web.Response(body=_avatar(), content_type="image/png")
+
+    @asynccontextmanager
+    async def serve():
+        app = web.Application()
+        app.router.add_get("/{name:.+}", avatar)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        try:
+            yield f"http://127.0.0.1:{port}/avatar.png"
+        finally:
+            await close_session()
+            await runner.cleanup()
+            member_cache.clear()
+            avatar_cache.clear()
+
+    serve.requests = []
+    serve.rejects_size = False
+    return serve
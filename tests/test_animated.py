@@ -0,0 +1,24 @@
+import asyncio
+import io
+
+import pytest
+from PIL import Image
+
+from DiscordLevelingCard import Output, RankCard, Sandbox
+
+
+@pytest.mark.parametrize("card_class, design", [(RankCard, "card1"), (Sandbox, "custom_card1")])
+@pytest.mark.parametrize("name, frames", [("animated.gif", 3), ("avatar.png", 1)])
+def test_animated_output_downloads_the_avatar_once(settings, avatar_server, card_class, design, name, frames):
+    async def run():
+        async with avatar_server() as url:
+            url = url.replace("avatar.png", name)
+            cards = []
+            for level in range(3):
+                card = card_class(settings=settings, avatar=url, level=level, username="member", current_exp=1, max_exp=10)
+                cards.append(await getattr(card, design)(resize=50, output=Output.gif(as_bytes=True)))
+            return cards
+
+    for data in asyncio.run(run()):
+        assert getattr(Image.open(io.BytesIO(data)), "n_frames", 1) == frames
+    assert avatar_server.requests == ["/" + name]
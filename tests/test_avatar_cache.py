@@ -0,0 +1,30 @@
+from PIL import Image, ImageChops, ImageDraw
+
+from DiscordLevelingCard.asset_registry import registry
+from DiscordLevelingCard.avatar_cache import FRAMES, MAX_CUSTOM_MASKS, _custom_masks, frame_mask
+
+
+def test_custom_mask_is_relative_to_the_working_directory(tmp_path, monkeypatch):
+    mask = Image.new("L", (64, 64))
+    ImageDraw.Draw(mask).rectangle((0, 0, 31, 63), fill=255)
+    mask.save(tmp_path / "mymask.png")
+    monkeypatch.chdir(tmp_path)
+
+    loaded = frame_mask("mymask.png", 32)
+    assert ImageChops.difference(loaded, mask.resize((32, 32))).getbbox() is None
+    assert ImageChops.difference(loaded, registry.mask(FRAMES["curvedborder"], (32, 32))).getbbox() is not None
+
+
+def test_missing_mask_falls_back_to_curvedborder(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    expected = registry.mask(FRAMES["curvedborder"], (32, 32))
+    assert frame_mask("missing.png", 32) is expected
+    assert frame_mask("curvedborder", 32) is expected
+
+
+def test_custom_masks_are_bounded(tmp_path, monkeypatch):
+    Image.new("L", (8, 8), 255).save(tmp_path / "mask.png")
+    monkeypatch.chdir(tmp_path)
+    for size in range(1, MAX_CUSTOM_MASKS + 10):
+        frame_mask("mask.png", size)
+    assert len(_custom_masks) == MAX_CUSTOM_MASKS
@@ -0,0 +1,29 @@
+import pytest
+from PIL import Image, ImageChops, ImageDraw
+
+from DiscordLevelingCard.bar_cache import BarSprite
+
+# (mode, size, background, width, height, curve, track fill) of the bars the designs draw
+BARS = [
+    ("RGB", (490, 51), (0, 0, 0), 420, 50, 30, (255, 255, 255, 50)),
+    ("RGB", (620, 51), (0, 0, 0), 619, 50, 30, (255, 255, 255, 50)),
+    ("RGBA", (620, 51), None, 619, 50, 30, (255, 255, 255, 225)),
+]
+
+
+def rounded(mode, size, background, width, height, curve, track_fill, length, fill):
+    # the bar as the designs drew it before the sprites
+    image = Image.new(mode, size, background) if background is not None else Image.new(mode, size)
+    draw = ImageDraw.Draw(image, "RGBA")
+    draw.rounded_rectangle((0, 0, width, height), curve, fill=track_fill)
+    draw.rounded_rectangle((0, 0, length, height), curve, fill=fill)
+    return image
+
+
+@pytest.mark.parametrize("bar", BARS)
+@pytest.mark.parametrize("fill", ["#ff000080", (0, 128, 255, 40), "#e9c46a", "white"])
+@pytest.mark.parametrize("length", [50, 70, 130, 260.5, 419])
+def test_sprite_matches_rounded_rectangle(bar, fill, length):
+    sprite = BarSprite(*bar)
+    expected = rounded(*bar, length, fill)
+    assert ImageChops.difference(sprite.render(length, fill), expected).getbbox() is None
@@ -0,0 +1,28 @@
+import asyncio
+import io
+
+from PIL import Image
+
+from DiscordLevelingCard import Output, RankCard, RenderScheduler
+
+
+def test_render_many_renders_like_the_card_method(settings, avatar_server):
+    timings = []
+    scheduler = RenderScheduler(1)
+
+    async def run():
+        async with avatar_server() as url:
+            members = [
+                {"avatar": url, "username": f"member{index}", "level": index, "current_exp": 1, "max_exp": 10,
+                 "timings_hook": timings.append, "scheduler": scheduler}
+                for index in range(3)
+            ]
+            return [result async for result in RankCard.render_many(settings, members, "card2", resize=50, output=Output.webp(as_bytes=True))]
+
+    results = asyncio.run(run())
+    assert len(results) == 3
+    for _, image in results:
+        assert Image.open(io.BytesIO(image)).format == "WEBP"
+    # the timings hook and the scheduler of every card saw its render
+    assert [timing.design for timing in timings] == ["card2"] * 3
+    assert scheduler.stats()["completed"] == 3
@@ -0,0 +1,44 @@
+import asyncio
+from urllib.parse import urlsplit
+
+import pytest
+
+from DiscordLevelingCard import RankCard, set_cdn_sizing
+from DiscordLevelingCard.discord_cdn import cdn_size
+
+
+# the size card1 draws the avatar at
+SIZE = cdn_size(RankCard._avatar_frame("card1", {"resize": 50, "direct": False})[0])
+
+
+@pytest.fixture
+def cdn_sizing():
+    yield set_cdn_sizing
+    set_cdn_sizing(True)
+
+
+def render(settings, avatar_server, cdn_sizing, name="avatars/123/abc.png"):
+    async def run():
+        async with avatar_server() as url:
+            url = url.replace("avatar.png", name)
+            cdn_sizing(True, hosts=[urlsplit(url).netloc])
+            card = RankCard(settings=settings, avatar=url, level=1, username="member", current_exp=1, max_exp=10)
+            return await card.card1(resize=50)
+
+    return asyncio.run(run())
+
+
+def test_cdn_avatar_is_downloaded_at_the_drawn_size(settings, avatar_server, cdn_sizing):
+    render(settings, avatar_server, cdn_sizing)
+    assert avatar_server.requests == [f"/avatars/123/abc.png?size={SIZE}"]
+
+
+def test_other_paths_are_downloaded_as_they_are(settings, avatar_server, cdn_sizing):
+    render(settings, avatar_server, cdn_sizing, name="banner.png")
+    assert avatar_server.requests == ["/banner.png"]
+
+
+def test_refused_size_falls_back_to_the_given_url(settings, avatar_server, cdn_sizing):
+    avatar_server.rejects_size = True
+    assert render(settings, avatar_server, cdn_sizing).getbuffer().nbytes
+    assert avatar_server.requests == [f"/avatars/123/abc.png?size={SIZE}", "/avatars/123/abc.png"]
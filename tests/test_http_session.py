@@ -0,0 +1,41 @@
+import asyncio
+import threading
+
+from DiscordLevelingCard import close_session, get_session
+
+
+async def _session():
+    return get_session()
+
+
+def test_session_of_a_closed_loop_is_replaced():
+    loop = asyncio.new_event_loop()
+    try:
+        # left open when its loop closes
+        old = loop.run_until_complete(_session())
+    finally:
+        loop.close()
+
+    try:
+        new = asyncio.run(_session())
+        assert new is not old
+        assert not new.closed
+    finally:
+        asyncio.run(close_session())
+
+
+def test_session_of_a_loop_running_in_another_thread_is_closed_there():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        old = asyncio.run_coroutine_threadsafe(_session(), loop).result()
+        assert asyncio.run(_session()) is not old
+        # the close was scheduled on the loop of the session
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), loop).result()
+        assert old.closed
+    finally:
+        asyncio.run(close_session())
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
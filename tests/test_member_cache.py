@@ -0,0 +1,43 @@
+import asyncio
+import io
+
+import pytest
+from PIL import Image
+
+from DiscordLevelingCard import RankCard, Sandbox
+
+DESIGNS = [(RankCard, "card1"), (RankCard, "card2"), (RankCard, "card3"), (Sandbox, "custom_card1"), (Sandbox, "custom_canvas")]
+
+
+@pytest.mark.parametrize("card_class, design", DESIGNS)
+@pytest.mark.parametrize("direct", [False, True])
+def test_resize_is_part_of_the_cached_card(settings, avatar_server, card_class, design, direct):
+    async def sizes():
+        async with avatar_server() as url:
+            card = card_class(settings=settings, avatar=url, level=3, username="member", current_exp=20, max_exp=100)
+            render = getattr(card, design)
+            return [Image.open(io.BytesIO((await render(resize=resize, direct=direct)).getvalue())).size for resize in (100, 50, 100)]
+
+    full, half, again = asyncio.run(sizes())
+    assert half == (full[0] // 2, full[1] // 2)
+    assert again == full
+
+
+def test_custom_canvas_draws_extra_text_over_the_member(settings, avatar_server):
+    # the text of `extra_text` covers the username, the level and the avatar it overlaps, as it always did
+    async def render():
+        async with avatar_server() as url:
+            card = Sandbox(settings=settings, avatar=url, level=3, username="MMMM", current_exp=20, max_exp=100)
+            image = await card.custom_canvas(
+                has_background=False, overlay=None, avatar_position=(0, 0), avatar_size=200,
+                username_position=(300, 100), level_position=(300, 200), exp_bar_position=(330, 280),
+                extra_text=[["MMMM", (300, 100), 50, "#ff0000"], ["LEVEL: 3", (300, 200), 50, "#ff0000"], ["MMMM", (20, 20), 50, "#ff0000"]]
+            )
+            return Image.open(io.BytesIO(image.getvalue())).convert("RGB")
+
+    image = asyncio.run(render())
+    for box in ((300, 100, 500, 160), (300, 200, 500, 260), (20, 20, 200, 80)):
+        colours = {colour for _, colour in image.crop(box).getcolors(1 << 16)}
+        assert (255, 0, 0) in colours
+    # the white username and level are fully covered
+    assert (255, 255, 255) not in {colour for _, colour in image.crop((300, 100, 500, 270)).getcolors(1 << 16)}
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from DiscordLevelingCard import RankCard, RenderScheduler
+from DiscordLevelingCard.benchmark import synthetic_avatar
+from DiscordLevelingCard.error import RenderDeadlineExceeded, RenderQueueFull
+
+
+async def sleep(value, seconds=0.05):
+    await asyncio.sleep(seconds)
+    return value
+
+
+def test_full_queue_is_rejected():
+    async def run():
+        scheduler = RenderScheduler(max_in_flight=1, max_queue=1)
+        return scheduler, await asyncio.gather(*(scheduler.run(sleep(i)) for i in range(3)), return_exceptions=True)
+
+    scheduler, results = asyncio.run(run())
+    assert results[:2] == [0, 1]
+    assert isinstance(results[2], RenderQueueFull)
+    assert scheduler.stats()["rejected"] == 1
+
+
+def test_expired_render_never_starts():
+    started = []
+
+    async def render(i):
+        started.append(i)
+        return await sleep(i, 0.1)
+
+    async def run():
+        scheduler = RenderScheduler(max_in_flight=1)
+        return await asyncio.gather(scheduler.run(render(0)), scheduler.run(render(1), deadline=0.01), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert results[0] == 0 and isinstance(results[1], RenderDeadlineExceeded)
+    assert started == [0]
+
+
+@pytest.mark.parametrize("max_in_flight", [1, 2])
+def test_card_with_the_same_scheduler_takes_one_slot(settings, max_in_flight):
+    async def run():
+        scheduler = RenderScheduler(max_in_flight=max_in_flight, deadline=1)
+        card = RankCard(settings=settings, avatar=synthetic_avatar(128), level=1, username="member", current_exp=1, max_exp=2, scheduler=scheduler)
+        image = await scheduler.run(card.card2(), deadline=0.5)
+        return scheduler, image
+
+    scheduler, image = asyncio.run(run())
+    assert image.getbuffer().nbytes > 0
+    assert scheduler.stats() == {"running": 0, "queued": 0, "completed": 1, "rejected": 0, "expired": 0}
+
+
+def test_identical_cards_share_a_render_only_with_the_same_scheduler(settings):
+    async def run():
+        avatar = synthetic_avatar(128)
+        schedulers = [RenderScheduler(), RenderScheduler()]
+        cards = [
+            RankCard(settings=settings, avatar=avatar, level=1, username="member", current_exp=1, max_exp=2, scheduler=scheduler)
+            for scheduler in (schedulers[0], schedulers[0], schedulers[1])
+        ]
+        await asyncio.gather(*(card.card1() for card in cards))
+        return [scheduler.stats()["completed"] for scheduler in schedulers]
+
+    assert asyncio.run(run()) == [1, 1]
+
+
+def test_identical_renders_inside_and_outside_a_slot_do_not_wait_for_each_other(settings):
+    async def run():
+        scheduler = RenderScheduler(max_in_flight=1)
+        card = RankCard(settings=settings, avatar=synthetic_avatar(128), level=1, username="member", current_exp=1, max_exp=2, scheduler=scheduler)
+        return await asyncio.wait_for(asyncio.gather(card.card2(), scheduler.run(card.card2())), 10)
+
+    outside, inside = asyncio.run(run())
+    assert outside.getvalue() == inside.getvalue()
@@ -0,0 +1,92 @@
+import asyncio
+import base64
+import io
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from PIL import Image
+
+from DiscordLevelingCard.server import RenderServer
+
+MEMBER = {"username": "member", "level": 3, "current_exp": 20, "max_exp": 100, "rank": 1}
+
+
+def post(settings, avatar_server, spec, avatar_hosts=("127.0.0.1",), avatar_name="avatar.png"):
+    async def run():
+        async with avatar_server() as url:
+            server = RenderServer({"default": settings}, avatar_hosts=avatar_hosts)
+            async with TestClient(TestServer(server.application())) as client:
+                url = url.replace("avatar.png", avatar_name)
+                response = await client.post("/render", json={**MEMBER, "avatar": url, **spec})
+                return response.status, response.content_type, await response.read()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("design", ["card1", "card2", "card3", "custom_card1", "custom_canvas"])
+def test_render(settings, avatar_server, design):
+    status, content_type, body = post(settings, avatar_server, {"design": design, "options": {"resize": 50}, "output": {"format": "webp"}})
+    assert (status, content_type) == (200, "image/webp")
+    assert Image.open(io.BytesIO(body)).format == "WEBP"
+
+
+@pytest.mark.parametrize("spec", [
+    {"design": "card9"},
+    {"settings": "other"},
+    {"level": "x"},
+    {"max_exp": 0},
+    {"current_exp": -1},
+    {"username": "x" * 1000},
+    {"options": {"nope": 1}},
+    {"options": {"resize": "abc"}},
+    {"options": {"resize": 0}},
+    {"design": "card2", "options": {"resize": 5000}},
+    {"options": {"direct": "yes"}},
+    {"design": "custom_card1", "options": {"card_colour": "not a colour"}},
+    {"design": "custom_canvas", "options": {"layout": {}}},
+    {"design": "custom_canvas", "options": {"text_font": "/etc/passwd"}},
+    {"design": "custom_canvas", "options": {"avatar_frame": "/etc/passwd"}},
+    {"design": "custom_canvas", "options": {"canvas_size": [4000, 4000]}},
+    {"design": "custom_canvas", "options": {"canvas_size": [2000, 1000], "resize": 200}},
+    {"design": "custom_canvas", "options": {"canvas_size": "big"}},
+    {"design": "custom_canvas", "options": {"level_position": 5}},
+    {"design": "custom_canvas", "options": {"avatar_size": 100000}},
+    {"design": "custom_canvas", "options": {"overlay": [[[10, 10], [0, 0], [1, 2], 100]]}},
+    {"design": "custom_canvas", "options": {"extra_text": [["hi", [0, 0], 30, {"a": 1}]]}},
+    {"design": "custom_canvas", "options": {"bar_exp": "half"}},
+    {"output": {"format": "bmp"}},
+    {"output": {"quality": "high"}},
+    {"output": {"size": 1}},
+])
+def test_invalid_spec(settings, avatar_server, spec):
+    status, content_type, body = post(settings, avatar_server, spec)
+    assert status == 400, body
+    assert content_type == "application/json"
+
+
+def _base64(data):
+    return base64.b64encode(data).decode()
+
+
+def test_undecodable_avatar_base64(settings, avatar_server):
+    status, _, body = post(settings, avatar_server, {"avatar": None, "avatar_base64": _base64(b"not an image")})
+    assert status == 400, body
+
+
+def test_truncated_avatar_base64(settings, avatar_server):
+    buffer = io.BytesIO()
+    Image.effect_noise((256, 256), 64).convert("RGB").save(buffer, "PNG")
+    status, _, body = post(settings, avatar_server, {"avatar": None, "avatar_base64": _base64(buffer.getvalue()[:2000])})
+    assert status == 400, body
+
+
+def test_undecodable_avatar_url(settings, avatar_server):
+    status, _, body = post(settings, avatar_server, {"design": "card2"}, avatar_name="broken.png")
+    assert status == 502, body
+
+
+def test_avatar_host_not_allowed(settings, avatar_server):
+    # only the Discord CDN by default
+    status, _, body = post(settings, avatar_server, {}, avatar_hosts=None)
+    assert status == 400, body
+    assert b"cdn.discordapp.com" in body
@@ -0,0 +1,27 @@
+import inspect
+
+import pytest
+
+from DiscordLevelingCard import RankCard, Sandbox
+
+# the positional parameters of the public methods before any option was added, new options only go after them
+POSITIONAL = {
+    (RankCard, "__init__"): ["settings", "avatar", "level", "username", "current_exp", "max_exp", "rank"],
+    (RankCard, "card1"): ["resize"],
+    (RankCard, "card2"): ["resize"],
+    (RankCard, "card3"): ["resize"],
+    (Sandbox, "__init__"): ["settings", "avatar", "level", "username", "current_exp", "max_exp", "cacheing", "rank"],
+    (Sandbox, "custom_card1"): ["card_colour", "resize"],
+    (Sandbox, "custom_canvas"): [
+        "has_background", "background_colour", "canvas_size", "resize", "overlay", "avatar_frame", "avatar_size",
+        "avatar_position", "text_font", "username_position", "username_font_size", "level_position", "level_font_size",
+        "exp_position", "exp_font_size", "bar_exp", "exp_bar_width", "exp_bar_height", "exp_bar_background_colour",
+        "exp_bar_position", "exp_bar_curve", "extra_text"
+    ],
+}
+
+
+@pytest.mark.parametrize("method, names", POSITIONAL.items(), ids=lambda value: value[1] if isinstance(value, tuple) else "")
+def test_positional_parameters_keep_their_place(method, names):
+    parameters = list(inspect.signature(getattr(*method)).parameters)[1:]
+    assert parameters[:len(names)] == names